@@ -0,0 +1,184 @@
+import argparse
+import json
+import platform
+import random
+import numpy as np
+import pygame as pg
+from copy import deepcopy
+from math import sqrt
+from statistics import mean, median
+from time import perf_counter, strftime
+from src.game_state.player_controller import IdleController
+from src.game_state.render_queue import RenderQueue
+from src.game_state.world import build_world
+from src.combat.abilities import ALL_ABILITIES, BASIC_ABILITIES, SPECIAL_ABILITIES
+from src.models.traits import ALL_TRAITS
+from src.util.font import Font
+from src.util.settings import BASE_STATS, SPAWN_RADIUS, SPARSE_BEHAVIOUR_CREATURES, AI_BUDGET_MS, RES, WIDTH, HEIGHT, QUEST_CARD_UI
+
+# times every stage of a tick separately for worlds of increasing size
+# run from the root directory: python -m benchmarks.tick_stages
+
+SIZES = [10, 100, 1000, 10000]
+
+STAGES = ['parse_input', 'ai_movement', 'ai_ability', 'spend_energy', 'move', 'grid',
+          'corpses', 'combat', 'render', 'font']
+
+# text drawn in the font stage, roughly what the hud and quest menu draw
+FONT_TEXT = [
+    ('gen 12', 0, 'center', 0),
+    ('quests', 0, 'center', 0),
+    ('ability strike', QUEST_CARD_UI['f'], 'center', QUEST_CARD_UI['w']),
+    ('trait claws', QUEST_CARD_UI['f'], 'center', QUEST_CARD_UI['w']),
+    ('alloc pwr 3', QUEST_CARD_UI['f'], 'center', QUEST_CARD_UI['w']),
+]
+
+def build(num_creatures, seed, ai_budget_ms):
+    # world with the player and num_creatures others of varied bodies
+    # spread over an area that grows with the count to keep the density fixed
+    game_data = build_world(0, 0, seed, num_creatures >= SPARSE_BEHAVIOUR_CREATURES, ai_budget_ms)
+    entities = game_data['entities']
+    spawn_radius = SPAWN_RADIUS*sqrt(num_creatures/100)
+    for i in range(num_creatures):
+        stats = deepcopy(BASE_STATS)
+        num_legs = random.randint(0, 3)
+        # strikes swing the first pair of legs
+        abilities = [ability for ability in SPECIAL_ABILITIES
+                     if num_legs or 'strike' not in ALL_ABILITIES[ability]['type']]
+        entities.add_new_entity({
+            'pos': [random.uniform(-spawn_radius, spawn_radius),
+                    random.uniform(-spawn_radius, spawn_radius), 20, 0],
+            'spd': 5,
+            'acc': 0.5,
+            'body_parts': random.randint(3, 10),
+            'size': 5,
+            'scale': -6,
+            'max_parts': 10,
+            'num_legs': num_legs,
+            'leg_length': random.randint(50, 100),
+            'aggression': [],
+            'herd': [],
+            'abilities': BASIC_ABILITIES+random.sample(abilities, random.randint(0, 2)),
+            'traits': random.sample(ALL_TRAITS, random.randint(0, 3))
+        }, stats)
+    # random standings between every pair that can see each other so that
+    # the ai chases and flees, pairs further apart are never looked at
+    awareness = entities.calculation_column('awareness').max()
+    for i in range(len(entities.creature)):
+        others = entities.neighbours(entities.pos[i][0], entities.pos[i][1], awareness)
+        for j, score in zip(others, np.random.uniform(-1, 1, len(others))):
+            entities.behaviours.set_score('aggression', i, j, score)
+    return game_data
+
+def run(num_creatures, ticks, warmup, seed, font, ai_budget_ms):
+    start = perf_counter()
+    game_data = build(num_creatures, seed, ai_budget_ms)
+    build_time = perf_counter()-start
+
+    entities = game_data['entities']
+    corpses = game_data['corpses']
+    combat_system = game_data['combat_system']
+    ai_controller = game_data['ai']
+    camera = game_data['camera']
+    sim_clock = game_data['sim_clock']
+    controller = IdleController(game_data['player'])
+    render_queue = RenderQueue()
+    screen = pg.Surface(RES)
+    dt = sim_clock.dt
+
+    times = {stage: [] for stage in STAGES}
+    for tick in range(warmup+ticks):
+        stage_times = []
+        t0 = perf_counter()
+        entities.parse_input(controller.movement_input(), camera, dt)
+        combat_system.use_ability(controller.ability_input(entities))
+        stage_times.append(perf_counter())
+        ai_controller.movement_input(entities, corpses, camera, dt)
+        stage_times.append(perf_counter())
+        ai_controller.ability_input(entities, combat_system)
+        stage_times.append(perf_counter())
+        rows, row_dt = entities.step_rows(dt)
+        entities.spend_energy(rows, row_dt)
+        stage_times.append(perf_counter())
+        entities.move(camera, rows, row_dt, sim_clock.time)
+        stage_times.append(perf_counter())
+        entities.update_grid()
+        stage_times.append(perf_counter())
+        camera.follow_entity(entities, game_data['player'])
+        corpses.update()
+        stage_times.append(perf_counter())
+        combat_system.update(entities, camera)
+        stage_times.append(perf_counter())
+        screen.fill('black')
+        entities.render(render_queue, camera)
+        corpses.render(render_queue)
+        render_queue.flush(screen, camera)
+        stage_times.append(perf_counter())
+        for text, size, style, box_width in FONT_TEXT:
+            font.render(screen=screen, text=text, x=WIDTH//2, y=HEIGHT//2,
+                        colour=(255, 255, 255), size=size, style=style, box_width=box_width)
+        stage_times.append(perf_counter())
+        sim_clock.step()
+        # dead creatures are left in so that every tick times the same world
+
+        if tick < warmup:
+            continue
+        for stage, end in zip(STAGES, stage_times):
+            times[stage].append((end-t0)*1000)
+            t0 = end
+
+    stages = {}
+    for stage in STAGES:
+        stages[stage] = {
+            'mean_ms': mean(times[stage]),
+            'median_ms': median(times[stage]),
+            'min_ms': min(times[stage]),
+            'max_ms': max(times[stage]),
+        }
+    tick_times = [sum(times[stage][i] for stage in STAGES) for i in range(ticks)]
+    return {
+        'creatures': num_creatures,
+        'ticks': ticks,
+        'build_s': build_time,
+        'tick_mean_ms': mean(tick_times),
+        'tick_median_ms': median(tick_times),
+        'stages': stages,
+        'render_counts': render_queue.counts,
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--ticks', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='benchmark_results.json')
+    # ms per tick the ai may spend deciding, 0 for no limit
+    parser.add_argument('--ai-budget', type=float, default=AI_BUDGET_MS)
+    args = parser.parse_args()
+    ai_budget_ms = args.ai_budget or None
+
+    font = Font(pg.image.load('./assets/font/font.png'))
+    results = []
+    for num_creatures in args.sizes:
+        result = run(num_creatures, args.ticks, args.warmup, args.seed, font, ai_budget_ms)
+        results.append(result)
+        print(f'{num_creatures} creatures: {result["tick_mean_ms"]:.2f}ms per tick (build {result["build_s"]:.2f}s)')
+        for stage in STAGES:
+            print(f'    {stage:<12} {result["stages"][stage]["mean_ms"]:.3f}ms')
+
+    with open(args.out, 'w') as f:
+        json.dump({
+            'date': strftime('%Y-%m-%d %H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pygame': pg.version.ver,
+            'machine': platform.machine(),
+            'seed': args.seed,
+            'warmup': args.warmup,
+            'ai_budget_ms': ai_budget_ms,
+            'results': results,
+        }, f, indent=4)
+
+if __name__ == '__main__':
+    main()
@@ -1,24 +1,17 @@
+import argparse
 import pygame as pg
-from src.game_state.ai_controller import AIController
 from src.game_state.player_controller import PlayerController
-from src.game_state.camera import Camera
+from src.game_state.render_queue import RenderQueue
 from src.game_state.menus import start_menu
+from src.game_state.headless import run_headless
 from src.game_state.ui import UserInterface
+from src.game_state.world import build_world
 
-from src.entities.entities import Entities
-from src.entities.corpse import Corpses
-from src.entities.evo_system import EvoSystem
-from src.entities.combat_system import CombatSystem
-
-from src.combat.abilities import BASIC_ABILITIES
-
-from src.environment.environment import Environment
-
-from src.util.settings import RES, BASE_STATS
+from src.util.settings import RES, AI_WORKERS
 from src.util.asset_loader import load_assets
 from src.util.font import Font
 
-def main():
+def main(args):
     pg.init()
     screen = pg.display.set_mode(RES)
     pg.mouse.set_visible(False)
@@ -39,53 +32,51 @@ def main():
 
     player = 0
 
-    camera = Camera(0, 0, 0)
-    entities = Entities()
-    entities.add_new_entity({
-        'pos': [0, 0, 20, 0],
-        'spd': 5,
-        'acc': 0.5,
-        'body_parts': 10,
-        'size': 5,
-        'scale': -6,
-        'max_parts': 10,
-        'num_legs': 0,
-        'leg_length': 100,
-        'aggression': [],
-        'herd': [],
-        'abilities': BASIC_ABILITIES,
-        'traits': []
-    }, BASE_STATS)
-    corpses = Corpses()
-    evo_system = EvoSystem(entities)
-    combat_system = CombatSystem(entities, camera)
+    game_data = build_world(player, args.creatures, args.seed, ai_workers=args.ai_workers)
+    render_queue = RenderQueue()
     
     controller = PlayerController(player)
-    ai_controller = AIController(player)
-
-    environment = Environment({
-        'region_data': {},
-    })
 
     font = Font(pg.image.load('./assets/font/font.png'))
     ui = UserInterface(player, font, sprites)
 
-    game_data = {
-        'entities': entities,
-        'camera': camera,
-        'player': player,
+    game_data.update({
+        'render_queue': render_queue,
         'controller': controller,
-        'ai': ai_controller,
         'ui': ui,
         'clock': clock,
         'sprites': sprites,
         'font': font,
-        'corpses': corpses,
-        'evo_system': evo_system,
-        'combat_system': combat_system,
-        'environment': environment,
-    }
+    })
     start_menu(screen, game_data)
 
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--headless', action='store_true',
+                        help='run the simulation without a window and print a summary')
+    parser.add_argument('--ticks', type=int, default=0,
+                        help='headless: stop after this many ticks')
+    parser.add_argument('--generations', type=int, default=0,
+                        help='headless: stop after this many generations')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--creatures', type=int, default=0,
+                        help='number of creatures spawned next to the player')
+    parser.add_argument('--ai-workers', type=int, default=AI_WORKERS,
+                        help='processes that plan the ai, 0 plans it in the main process')
+    parser.add_argument('--player', choices=['idle', 'scripted'], default='idle',
+                        help='headless: what drives the player')
+    parser.add_argument('--trace', default=None,
+                        help='headless: write a chrome trace of the last ticks to this file')
+    return parser.parse_args()
+
 if __name__ == '__main__':
-    main()
+    args = parse_args()
+    if args.headless:
+        if not args.ticks and not args.generations:
+            args.ticks = 1000
+        summary = run_headless(args.ticks, args.generations, 
+                               0 if args.seed is None else args.seed,
+                               args.creatures, args.player, args.trace, args.ai_workers)
+        print(', '.join(f'{key}: {value}' for key, value in summary.items()))
+    else:
+        main(args)
@@ -1,4 +1,5 @@
 import pygame as pg
+import numpy as np
 from src.util.settings import MODEL_COLORS
 
 MAX_NUM_ABILITIES = 5
@@ -12,7 +13,7 @@ SPECIAL_ABILITIES = [
     'grapple', # with arm/tongue/tail with high intelligence
     'bite', # with mouth and teeth
     'hit', # with legs/arm/tail
-    'rush' # upgraded version of advance with antlers/horn/corn
+    'rush', # upgraded version of advance with antlers/horn/corn
     'fly', # for flying creatures -> basically increase z value
     'swim', # for swimming creatures -> decrease z value and move in water
     # 'run', # begin running for creatures that can run -> faster top speed
@@ -83,6 +84,9 @@ ALL_ABILITIES = {
     }
 }
 
+# abilities on cooldown are stored per entity as a bitmask, see Entities.cooldowns
+ABILITY_BIT = {ability: 1 << i for i, ability in enumerate(ALL_ABILITIES)}
+
 BASE_AOE_RADIUS = 500
 
 class ActiveAbility:
@@ -95,14 +99,15 @@ class ActiveAbility:
     def update(self, pos, range):
         self.pos = pos
         self.range = range
+        # position and size of the hit boxes as one (n, 4) array, built
+        # once per update instead of every time a target is tested
+        self.boxes = np.empty((len(pos), 4))
+        if len(pos):
+            self.boxes[:, :3] = np.asarray(pos, dtype=np.float64)[:, :3]
+        self.boxes[:, 3] = range
     
     def get_pos(self):
-        all_pos = []
-         # gets the position and size of the hit_boxes
-        for pos in self.pos:
-            all_pos.append([pos[0], pos[1], pos[2], self.range])
-
-        return all_pos
+        return self.boxes
 
     def render(self, screen, camera):
         for pos in self.pos:
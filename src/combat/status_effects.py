@@ -7,7 +7,7 @@ STATUS_EFFECTS = [
     'stunned', # reduced mobility
     'intimidated', # causes enemies to run away
     'in_air',
-    'underwater'
+    'underwater',
     'strike',
     'grapple'
 ]
@@ -20,4 +20,24 @@ DOT_EFFECTS = [
     'poisoned', 'bleeding',
 ]
 
-BASE_CD = 1000
\ No newline at end of file
+BASE_CD = 1000
+
+# effects are stored per entity as a bitmask, see Entities.status
+NUM_STATUS_EFFECTS = len(STATUS_EFFECTS)
+STATUS_INDEX = {effect: i for i, effect in enumerate(STATUS_EFFECTS)}
+STATUS_BIT = {effect: 1 << i for i, effect in enumerate(STATUS_EFFECTS)}
+
+status_mask = lambda effects : sum(STATUS_BIT[effect] for effect in effects)
+
+MOVEMENT_IMPAIR_MASK = status_mask(MOVEMENT_IMPAIR_EFFECTS)
+# number of impairing effects in each status & MOVEMENT_IMPAIR_MASK
+MOVEMENT_IMPAIR_COUNT = [bin(bits & MOVEMENT_IMPAIR_MASK).count('1') for bits in range(MOVEMENT_IMPAIR_MASK+1)]
+DOT_MASK = status_mask(DOT_EFFECTS)
+# effects that lift the feet off the ground
+AIRBORNE_MASK = status_mask(['in_air', 'underwater'])
+# effects that last until they are toggled off
+PERSISTENT_MASK = AIRBORNE_MASK
+# effects that only come from fighting
+COMBAT_MASK = status_mask(STATUS_EFFECTS) & ~PERSISTENT_MASK
+# effects that the legs animate, in the order they are animated
+ANIMATED_EFFECTS = ['strike', 'in_air', 'underwater']
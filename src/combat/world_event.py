@@ -1,4 +1,6 @@
+import numpy as np
 from random import choice
+from src.models.traits import ALL_TRAITS
 from src.util.settings import STAT_GAP
 
 EVENT_REQ = [
@@ -9,10 +11,12 @@ EVENT_REQ = [
 ]
 
 MISC_REQS = {
-    'no_dupe_trait': lambda data: data['trait'] not in data['traits'].traits,
-    'no_dupe_ability': lambda data: data['ability'] not in data['abilities'],
-    'legs': lambda data: data['creature'].legs.num_legs()>0,
-    'free_legs': lambda data: data['creature'].legs.num_legs()>1, 
+    # the reward is not owned yet, checked against the trait and ability bitsets
+    'no_dupe_trait': 0,
+    'no_dupe_ability': 0,
+    # bits of body_flags
+    'legs': 1,
+    'free_legs': 2,
 }
 
 TRAIT_QUESTS = {
@@ -91,143 +95,144 @@ ABILITY_QUESTS = {
 
 STAT_QUESTS = ['itl', 'pwr', 'def', 'mbl', 'stl']
 
-def meets_misc_req(trait, data):
-    data['trait'] = trait
-    return all([MISC_REQS[req](data) for req in TRAIT_QUESTS[trait]['misc_req']])
+PHYSIOLOGY_QUESTS = ['new_parts', 'increase_body', 'decrease_body', 'new_leg', 'leg_upgrade']
+
+#############################
+# compiled requirements     #
+#############################
+# the quest tables as bitsets and stat vectors, so that the quests open to
+# every entity that changed are worked out together, see Entities.quest_masks
+TRAIT_NAMES = list(dict.fromkeys(ALL_TRAITS+list(TRAIT_QUESTS)+
+                                 [trait for quest in ABILITY_QUESTS.values() for trait in quest['trait_req']]))
+TRAIT_BIT = {trait: 1 << i for i, trait in enumerate(TRAIT_NAMES)}
+ABILITY_QUEST_BIT = {ability: 1 << i for i, ability in enumerate(ABILITY_QUESTS)}
+
+bit_mask = lambda bits, names : sum(bits.get(name, 0) for name in set(names))
+misc_mask = lambda reqs : sum(MISC_REQS[req] for req in reqs)
+
+TRAIT_QUEST_BITS = np.array([TRAIT_BIT[trait] for trait in TRAIT_QUESTS], dtype=np.int64)
+TRAIT_QUEST_MISC = np.array([misc_mask(quest['misc_req']) for quest in TRAIT_QUESTS.values()], dtype=np.int64)
+ABILITY_QUEST_TRAITS = np.array([bit_mask(TRAIT_BIT, quest['trait_req']) for quest in ABILITY_QUESTS.values()], dtype=np.int64)
+ABILITY_QUEST_MISC = np.array([misc_mask(quest['misc_req']) for quest in ABILITY_QUESTS.values()], dtype=np.int64)
+ABILITY_QUEST_NO_DUPE = np.array(['no_dupe_ability' in quest['misc_req'] for quest in ABILITY_QUESTS.values()])
+ABILITY_QUEST_BITS = np.array(list(ABILITY_QUEST_BIT.values()), dtype=np.int64)
+STAT_BITS = np.array([1 << i for i in range(len(STAT_QUESTS))], dtype=np.int64)
+PHYSIOLOGY_BITS = np.array([1 << i for i in range(len(PHYSIOLOGY_QUESTS))], dtype=np.int64)
+
+# the masks kept per entity in Entities.quest_masks
+QUEST_MASKS = ['trait', 'ability', 'stat', 'alloc', 'physiology', 'level_up']
+QUEST_MASK_INDEX = {mask: i for i, mask in enumerate(QUEST_MASKS)}
+
+def body_flags(creature):
+    num_legs = creature.legs.num_legs()
+    return MISC_REQS['legs']*(num_legs>0) | MISC_REQS['free_legs']*(num_legs>1)
+
+def pack(open_quests, bits):
+    # (n, k) bools into n bitsets
+    return np.bitwise_or.reduce(np.where(open_quests, bits, 0), axis=1)
+
+def quest_masks(entities, rows):
+    # the QUEST_MASKS of each of rows
+    traits = np.array([bit_mask(TRAIT_BIT, entities.traits[i].traits) for i in rows], dtype=np.int64)
+    abilities = np.array([bit_mask(ABILITY_QUEST_BIT, entities.abilities[i]) for i in rows], dtype=np.int64)
+    body = np.array([body_flags(entities.creature[i]) for i in rows], dtype=np.int64)
+    stats = np.array([[entities.stats[i][stat] for stat in STAT_QUESTS] for i in rows], dtype=np.float64).reshape(-1, len(STAT_QUESTS))
+    max_stats = np.array([[entities.traits[i].max_stats[stat] for stat in STAT_QUESTS] for i in rows], dtype=np.float64).reshape(-1, len(STAT_QUESTS))
+    masks = np.zeros((len(rows), len(QUEST_MASKS)), dtype=np.int64)
+
+    # traits that are not owned and whose body requirements are met
+    open_traits = (((traits[:, None] & TRAIT_QUEST_BITS) == 0) &
+                   ((body[:, None] & TRAIT_QUEST_MISC) == TRAIT_QUEST_MISC))
+    masks[:, QUEST_MASK_INDEX['trait']] = pack(open_traits, TRAIT_QUEST_BITS)
+
+    # abilities whose traits are owned, that are not owned and whose body
+    # requirements are met
+    open_abilities = (((traits[:, None] & ABILITY_QUEST_TRAITS) == ABILITY_QUEST_TRAITS) &
+                      ~(ABILITY_QUEST_NO_DUPE & ((abilities[:, None] & ABILITY_QUEST_BITS) != 0)) &
+                      ((body[:, None] & ABILITY_QUEST_MISC) == ABILITY_QUEST_MISC))
+    masks[:, QUEST_MASK_INDEX['ability']] = pack(open_abilities, ABILITY_QUEST_BITS)
+
+    # stats that can be upgraded, only the ones the trait being worked
+    # towards needs and none once it can level up
+    open_stats = np.ones((len(rows), len(STAT_QUESTS)), dtype=np.bool_)
+    level_up = np.zeros(len(rows), dtype=np.bool_)
+    for k, i in enumerate(rows):
+        new_trait = entities.traits[i].new_trait
+        if new_trait:
+            stats_req = np.array([new_trait['stats_req'].get(stat, 0) for stat in STAT_QUESTS])
+            open_stats[k] = [stat in new_trait['stats_req'] for stat in STAT_QUESTS]
+            level_up[k] = np.all(stats_req*new_trait['level'] <= max_stats[k])
+    open_stats[level_up] = False
+    masks[:, QUEST_MASK_INDEX['stat']] = pack(open_stats, STAT_BITS)
+    masks[:, QUEST_MASK_INDEX['alloc']] = pack(stats == max_stats*STAT_GAP, STAT_BITS)
+    masks[:, QUEST_MASK_INDEX['level_up']] = level_up
+
+    # physiology changes the body still has room for
+    max_parts = entities.calculation_column('max_parts')[rows]
+    max_size = entities.calculation_column('max_size')[rows]
+    min_size = entities.calculation_column('min_size')[rows]
+    max_legs = entities.calculation_column('max_legs')[rows]
+    creatures = [entities.creature[i] for i in rows]
+    parts = np.array([creature.max_parts for creature in creatures], dtype=np.float64)
+    size = np.array([creature.size for creature in creatures], dtype=np.float64)
+    pair_legs = np.array([creature.legs.num_pair_legs for creature in creatures], dtype=np.float64)
+    unmaxed_leg = np.array([creature.legs.get_unmaxed_leg_index() != -1 for creature in creatures], dtype=np.bool_)
+    open_physiology = np.stack([parts<max_parts, size<max_size, size>min_size, pair_legs<max_legs, unmaxed_leg], axis=1).reshape(-1, len(PHYSIOLOGY_QUESTS))
+    masks[:, QUEST_MASK_INDEX['physiology']] = pack(open_physiology, PHYSIOLOGY_BITS)
+    return masks
 
 class WorldEvent:
     def __init__(self, entities, index):
         self.quests = self.generate_quest(entities, index)
     
     def generate_quest(self, entities, index):
-        entity_data = entities.get_entity_quest_data(index)
+        trait_mask, ability_mask, stat_mask, alloc_mask, physiology_mask, level_up = entities.quest_masks(index).tolist()
         all_quests = []
-        stats = entity_data['stats']
-        max_stats = entity_data['max_stats']
-        new_trait = entity_data['traits'].new_trait
-        traits = entity_data['traits'].traits
-        
+        new_trait = entities.traits[index].new_trait
 
-        possible_stat_quests = STAT_QUESTS
         if new_trait:
-            # get which stats should be upgradeable
-            stats_req = new_trait['stats_req']
-            possible_stat_quests = list(filter(lambda x : x in stats_req.keys(), STAT_QUESTS))
-            # also check if the trait can move onto the next level
-
-            trait_level = new_trait['level']
-            meets_level_up = True
-            for req in stats_req:
-                if stats_req[req] * trait_level > max_stats[req]:
-                    meets_level_up = False
-                    break
-            
-            if meets_level_up:
+            # the trait being worked towards moves onto the next
+            # level once the max stats allow it
+            if level_up:
                 all_quests.append(new_trait)
-                possible_stat_quests = []
         else:
             # if the entity is not currently trying to get a 
             # new trait, give them a random one they can accept
-            possible_trait_quests = list(filter(lambda x : x not in traits, TRAIT_QUESTS.keys()))
-            possible_trait_quests = list(filter(lambda x : meets_misc_req(x, entity_data), possible_trait_quests))
-            
-            trait = choice(possible_trait_quests)
-            all_quests.append({
-                'type': 'trait',
-                'reward': trait,
-                'stats_req': TRAIT_QUESTS[trait]['stats_req']
-            })
+            possible_trait_quests = [trait for trait in TRAIT_QUESTS if trait_mask & TRAIT_BIT[trait]]
+            if possible_trait_quests:
+                trait = choice(possible_trait_quests)
+                all_quests.append({
+                    'type': 'trait',
+                    'reward': trait,
+                    'stats_req': TRAIT_QUESTS[trait]['stats_req']
+                })
 
         # alternatively, they can choose to upgrade any stat/allocate
         # # stat upgrade / allocation quests
-        
-        for quest in possible_stat_quests:
-            if stats[quest]==max_stats[quest]*STAT_GAP:
+        for i, quest in enumerate(STAT_QUESTS):
+            if stat_mask >> i & 1:
                 all_quests.append({
-                    'type': 'alloc',
+                    'type': 'alloc' if alloc_mask >> i & 1 else 'upgrade',
                     'reward': quest,
                 })
-            else:
-                all_quests.append({
-                    'type': 'upgrade',
-                    'reward': quest,
-                })
-        
-        
-        # # obtain trait quests
-        # for quest in TRAIT_QUESTS.keys():
-        #     misc_req = TRAIT_QUESTS[quest]['misc_req']
-        #     stats_req = TRAIT_QUESTS[quest]['stats_req']
-        #     meets_misc_req = True
-        #     entity_data['trait'] = quest
-        #     for req in misc_req:
-        #         meets_misc_req = meets_misc_req and MISC_REQS[req](entity_data)
-        #     if meets_misc_req:
-        #         all_quests.append({
-        #             'type': 'trait',
-        #             'reward': quest,
-        #             'stats_req': stats_req,
-        #         })
         
         # obtain ability quests
-        for quest in ABILITY_QUESTS.keys():
-            trait_req = ABILITY_QUESTS[quest]['trait_req']
-            misc_req = ABILITY_QUESTS[quest]['misc_req']
-            meets_trait_req = True
-            entity_data['ability'] = quest
-            for req in trait_req:
-                meets_trait_req = (meets_trait_req and 
-                                  req in entity_data['traits'].traits)
-            
-            for req in misc_req:
-                meets_trait_req = (meets_trait_req and
-                                   MISC_REQS[req](entity_data))
-                
-            if meets_trait_req:
+        for quest, bit in ABILITY_QUEST_BIT.items():
+            if ability_mask & bit:
                 all_quests.append({
                     'type': 'ability',
                     'reward': quest,
                 })
         
         # new body part quests
-        # body part
-        max_parts = entities.entity_calculation(index, 'max_parts')
-        max_growth_size = entities.entity_calculation(index, 'max_size')
-        min_growth_size = entities.entity_calculation(index, 'min_size')
-        if entity_data['creature'].max_parts < max_parts:
-            all_quests.append({
-                'type': 'physiology',
-                'reward': 'new_parts'
-            })
-
-        if entity_data['creature'].size < max_growth_size:
-            all_quests.append({
-                'type': 'physiology',
-                'reward': 'increase_body',
-            })
-        if entity_data['creature'].size > min_growth_size:
-            all_quests.append({
-                'type': 'physiology',
-                'reward': 'decrease_body',
-            })
-        
-        # base this on the mbl stat as well
-        max_legs_allowed = entities.entity_calculation(index, 'max_legs')
-
-        if entity_data['creature'].legs.num_pair_legs < max_legs_allowed:
-            all_quests.append({
-                'type': 'physiology',
-                'reward': 'new_leg',
-            })
-        
-        if entity_data['creature'].legs.get_unmaxed_leg_index() != -1:
-            all_quests.append({
-                'type': 'physiology',
-                'reward': 'leg_upgrade'
-            })
-
+        for i, quest in enumerate(PHYSIOLOGY_QUESTS):
+            if physiology_mask >> i & 1:
+                all_quests.append({
+                    'type': 'physiology',
+                    'reward': quest,
+                })
         
         return all_quests
 
     def update(self):
-        pass
\ No newline at end of file
+        pass
@@ -1,19 +1,37 @@
-import pygame as pg
 import numpy as np
-from src.combat.abilities import ALL_ABILITIES, ActiveAbility
-from src.combat.status_effects import BASE_CD, DOT_EFFECTS
+from src.combat.abilities import ALL_ABILITIES, ABILITY_BIT, ActiveAbility
+from src.combat.status_effects import BASE_CD, DOT_EFFECTS, STATUS_BIT, STATUS_INDEX, DOT_MASK, PERSISTENT_MASK
+from src.util.timing_wheel import TimingWheel
+from src.util.spatial_hash import SpatialHash
+from src.util.settings import GRID_CELL_SIZE, LOD_NEAR
 
 from math import sin, cos, atan2
 
+# most (source, target) pairs tested at once by the narrowphase
+NARROWPHASE_CHUNK = 4096
+
+def bounding_spheres(spheres):
+    # center and radius of a sphere enclosing each row of [x, y, z, r]
+    # spheres, rows are padded with nan
+    real = ~np.isnan(spheres[:, :, 0])
+    center = np.where(real[:, :, None], spheres[:, :, :3], 0).sum(axis=1)/real.sum(axis=1)[:, None]
+    extent = np.sqrt(np.sum((spheres[:, :, :3]-center[:, None])**2, axis=2))+spheres[:, :, 3]
+    radius = np.where(real, extent, -np.inf).max(axis=1)
+    return center, radius
+
 class CombatSystem:
-    def __init__(self, entities, camera):
+    def __init__(self, entities, camera, clock):
         self.camera = camera
         self.entities = entities
+        # the SimClock, status effect times are in simulation time
+        self.clock = clock
+        # status expiries and ability cooldowns, fired when they are due
+        self.timers = TimingWheel(now=clock.time)
     
     def update(self, entities, camera):
         self.camera = camera
         self.entities = entities
-        self.status_effect_cds()
+        self.fire_timers()
         self.active_abilities()
         self.collide()
    
@@ -26,12 +44,17 @@ class CombatSystem:
             return
         
         # prevent spamming
-        if 'ability_lock' in self.entities.status_effects[index]['effects']:
+        if self.entities.status[index] & STATUS_BIT['ability_lock']:
             return
     
         # entity is stunned cannot use abilities
-        if 'stunned' in self.entities.status_effects[index]['effects']:
+        if self.entities.status[index] & STATUS_BIT['stunned']:
+            return
+
+        # the ability is still on cooldown
+        if self.entities.cooldowns[index] & ABILITY_BIT[a_i]:
             return
+        self.start_cooldown(index, a_i)
 
         # all abilities
         queued_ability = a_i
@@ -48,9 +71,7 @@ class CombatSystem:
             self.entities.vel[index][1] = spd_mod*self.entities.spd[index]*sin(angle)
 
             # update the entity hurt box to deal damage
-            movement_hurt_box = []
-            for part in self.entities.creature[index].skeleton:
-                movement_hurt_box.append([part[0], part[1], part[2]])
+            movement_hurt_box = self.entities.creature[index].skeleton[:, :3].copy()
             
             self.entities.hurt_box[index] = ActiveAbility('movement', movement_hurt_box, 
                                                 ALL_ABILITIES[queued_ability]['modifiers'],
@@ -82,92 +103,134 @@ class CombatSystem:
         toggled = []
         if 'toggle' in ALL_ABILITIES[queued_ability]['type']:
             for toggle in ALL_ABILITIES[queued_ability]['side_effects']:
-                for j in range(len(self.entities.status_effects[index]['effects'])-1, -1, -1):
-                    if self.entities.status_effects[index]['effects'][j] == toggle:
-                        toggled.append(toggle)
-                        self.entities.status_effects[index]['effects'][j:j+1] = []
-                        self.entities.status_effects[index]['cd'][j:j+1] = []
-                        self.entities.status_effects[index]['time'][j:j+1] = []
-                        self.entities.status_effects[index]['source'][j:j+1] = []
-
+                if self.entities.status[index] & STATUS_BIT[toggle]:
+                    toggled.append(toggle)
+                    self.entities.status[index] &= ~STATUS_BIT[toggle]
 
         for side_effect in ALL_ABILITIES[queued_ability]['side_effects']:
             if side_effect not in toggled:
-                self.apply_status(index, index, side_effect, pg.time.get_ticks())
+                self.apply_status(index, index, side_effect, self.clock.time)
 
     def collide(self):
-        for source in range(len(self.entities.hurt_box)):
-            self.hurtbox_collide(source)
+        time = self.clock.time
+        for source, target in self.hurtbox_hits():
+            # decrease hp
+            self.take_damage(target, 0)
+            # apply modifiers
+            for modifier in self.entities.hurt_box[source].modifiers:
+                self.apply_status(source, target, modifier, time)
+            # increase the target's aggression score against the attacker
+            behaviours = self.entities.behaviours
+            behaviours.set_score('aggression', target, source, 
+                                 min(behaviours.score('aggression', target, source)+0.1, 1))
+            self.entities.threats.mark(target)
     
     def aoe_collide(self, source, aoe, ability):
-        for target in range(len(self.entities.pos)):
-            time = pg.time.get_ticks()
+        time = self.clock.time
+        x, y = self.entities.pos[source][0], self.entities.pos[source][1]
+        for target in self.entities.neighbours(x, y, aoe):
             if target!=source:
-                dx = self.entities.pos[source][0]-self.entities.pos[target][0]
-                dy = self.entities.pos[source][1]-self.entities.pos[target][1]
-                if dx**2+dy**2<=aoe**2:
-                    for mod in ability['modifiers']:
-                        self.apply_status(source, target, mod, time)
-
-    def hurtbox_collide(self, source):
-        if self.entities.hurt_box[source]:
-            time = pg.time.get_ticks()
-            for target in range(len(self.entities.creature)):
-                if source!=target and self.entities.creature[target].collide(self.entities.hurt_box[source].get_pos()):
-                    # decrease hp
-                    self.take_damage(target, 0)
-                    # apply modifiers
-                    for modifier in self.entities.hurt_box[source].modifiers:
-                        self.apply_status(source, target, modifier, time)
-                    # increase the target's aggression score against the attacker
-                    self.entities.behaviours[target].aggression[source]+=0.1
+                for mod in ability['modifiers']:
+                    self.apply_status(source, target, mod, time)
+
+    def hurtbox_hits(self):
+        # every (source, target) pair whose hurt boxes and body overlap,
+        # for all active abilities in one pass
+        entities = self.entities
+        # only near entities have up to date bodies and fight, see LOD_NEAR
+        bodies = np.flatnonzero(entities.lod==LOD_NEAR)
+        sources = np.array([i for i in bodies if entities.hurt_box[i] and len(entities.hurt_box[i].get_pos())],
+                           dtype=np.int64)
+        if not len(sources):
+            return []
+        boxes = [entities.hurt_box[i].get_pos() for i in sources]
+        hurt_spheres = np.full((len(sources), max(len(box) for box in boxes), 4), np.nan)
+        for k, box in enumerate(boxes):
+            hurt_spheres[k, :len(box)] = box
+        hurt_center, hurt_radius = bounding_spheres(hurt_spheres)
+
+        # broadphase: the bodies are indexed by the centers of their
+        # bounding spheres, each source looks as far as its own radius and
+        # the largest body, and the pairs whose bounding spheres are apart
+        # are dropped in one test
+        hit_spheres = entities.skeletons.hit_boxes(bodies, entities.pos[bodies])
+        body_center, body_radius = bounding_spheres(hit_spheres)
+        grid = SpatialHash(GRID_CELL_SIZE)
+        grid.rebuild(body_center)
+        queries, targets, _ = grid.query_radius_batch(hurt_center[:, :2], hurt_radius+body_radius.max())
+        sq_dist = np.sum((hurt_center[queries]-body_center[targets])**2, axis=1)
+        near = (bodies[targets] != sources[queries]) & (sq_dist <= (hurt_radius[queries]+body_radius[targets])**2)
+        queries, targets = queries[near], targets[near]
+
+        # narrowphase: every body sphere against every hurt box of each
+        # surviving pair, the nan padding never collides
+        hit = np.zeros(len(queries), dtype=np.bool_)
+        for start in range(0, len(queries), NARROWPHASE_CHUNK):
+            hurt = hurt_spheres[queries[start:start+NARROWPHASE_CHUNK]][:, None]
+            body = hit_spheres[targets[start:start+NARROWPHASE_CHUNK]][:, :, None]
+            sq_dist = (body[..., 0]-hurt[..., 0])**2+(body[..., 1]-hurt[..., 1])**2+(body[..., 2]-hurt[..., 2])**2
+            hit[start:start+NARROWPHASE_CHUNK] = (sq_dist<=(body[..., 3]+hurt[..., 3])**2).any(axis=(1, 2))
+
+        sources, targets = sources[queries[hit]], bodies[targets[hit]]
+        order = np.lexsort((targets, sources))
+        return list(zip(sources[order].tolist(), targets[order].tolist()))
 
     def take_damage(self, target, dmg):
         self.entities.health[target] -= dmg 
 
     def dot_status(self):
-        for i in range(len(self.entities.status_effects)):
+        for i in np.flatnonzero(self.entities.status & DOT_MASK):
             for dot in DOT_EFFECTS:
-                if dot in self.entities.status_effects[i]['effects']:
+                if self.entities.status[i] & STATUS_BIT[dot]:
                     self.take_damage(i, 0)
                     print(f'{i} took dot damage')
 
     def apply_status(self, source, target, effect, time):
-        if effect in self.entities.status_effects[target]['effects']:
+        # sources are stored as handles so they survive other entities dying
+        self.add_status(target, effect, BASE_CD, time, self.entities.handle[source])
+
+    def add_status(self, target, effect, cd, time, source):
+        bit = STATUS_BIT[effect]
+        if self.entities.status[target] & bit:
             return
-        self.entities.status_effects[target]['effects'].append(effect)
-        self.entities.status_effects[target]['cd'].append(BASE_CD)
-        self.entities.status_effects[target]['time'].append(time)
-        self.entities.status_effects[target]['source'].append(source)
+        j = STATUS_INDEX[effect]
+        self.entities.status[target] |= bit
+        self.entities.status_cd[target, j] = cd
+        self.entities.status_start[target, j] = time
+        self.entities.status_source[target, j] = source
+        if not bit & PERSISTENT_MASK:
+            # the start time tells the expiry apart from that of an
+            # earlier instance of the effect that was toggled off
+            self.timers.schedule(time+cd, ('status', int(self.entities.handle[target]), effect, time))
+
+    def start_cooldown(self, index, ability):
+        self.entities.cooldowns[index] |= ABILITY_BIT[ability]
+        self.timers.schedule(self.clock.time+ALL_ABILITIES[ability]['cd'], 
+                             ('cooldown', int(self.entities.handle[index]), ability, None))
     
-    def status_effect_cds(self):
-        # entity loop
-        for i in range(len(self.entities.status_effects)):
-            if self.entities.status_effects[i]['effects']:
-                # status loop
-                num_effects = len(self.entities.status_effects[i]['effects'])
-                for j in range(num_effects):
-                    effect = self.entities.status_effects[i]['effects'][0]
-                    cd = self.entities.status_effects[i]['cd'][0]
-                    time = self.entities.status_effects[i]['time'][0]
-                    source = self.entities.status_effects[i]['source'][0]
-
-                    self.entities.status_effects[i]['effects'][0:1] = []
-                    self.entities.status_effects[i]['cd'][0:1] = []
-                    self.entities.status_effects[i]['time'][0:1] = []
-                    self.entities.status_effects[i]['source'][0:1] = []
-                    if pg.time.get_ticks()-time<cd or effect in ['underwater', 'in_air']:
-                        self.apply_status(source, i, effect, time)
-                    elif effect == 'ability_lock':
-                        self.entities.hurt_box[i] = None
-                        self.apply_status(source, i, 'ability_cd', pg.time.get_ticks())
+    def fire_timers(self):
+        # only the timers that are due are looked at, timers of entities
+        # that have died since are dropped
+        for kind, handle, name, start in self.timers.advance(self.clock.time):
+            i = self.entities.slot(handle)
+            if i is None:
+                continue
+            if kind == 'cooldown':
+                self.entities.cooldowns[i] &= ~ABILITY_BIT[name]
+                continue
+            j = STATUS_INDEX[name]
+            if not self.entities.status[i] & STATUS_BIT[name] or self.entities.status_start[i, j] != start:
+                continue
+            self.entities.status[i] &= ~STATUS_BIT[name]
+            if name == 'ability_lock':
+                # the cooldown starts once the ability is over
+                self.entities.hurt_box[i] = None
+                self.add_status(i, 'ability_cd', BASE_CD, self.clock.time, self.entities.status_source[i, j])
 
     def active_abilities(self):
         for i in range(len(self.entities.hurt_box)):
             if self.entities.hurt_box[i] and self.entities.hurt_box[i].type=='movement':
-                movement_hurt_box = []
-                for part in self.entities.creature[i].skeleton:
-                    movement_hurt_box.append([part[0], part[1], part[2]])
+                movement_hurt_box = self.entities.creature[i].skeleton[:, :3].copy()
                 self.entities.hurt_box[i].update(movement_hurt_box, 2*self.entities.creature[i].size)
             
             if self.entities.hurt_box[i] and self.entities.hurt_box[i].type == 'strike':
@@ -1,36 +1,92 @@
-import pygame as pg
+import numpy as np
+from src.util.settings import GRID_CELL_SIZE
+from src.util.spatial_hash import SpatialHash
+from src.util.column_store import ColumnStore, Column, swap_pop
+
+# most creatures looked up at once by corpses_in_sight
+SIGHT_CHUNK = 1024
+
+def corpses_in_sight(xy, grid, sight, reach):
+    # index of the nearest corpse within sight of each of xy, -1 where
+    # there is none, and whether it is within reach. grid is a SpatialHash
+    # over the corpses, see Corpses.index
+    targets = np.full(len(xy), -1, dtype=np.int64)
+    in_reach = np.zeros(len(xy), dtype=np.bool_)
+    for start in range(0, len(xy), SIGHT_CHUNK):
+        queries, items, dist_sq = grid.query_radius_batch(xy[start:start+SIGHT_CHUNK], sight)
+        # sorted nearest first within each query, so the first pair of a
+        # query is its nearest corpse
+        order = np.lexsort((dist_sq, queries))
+        queries, items, dist_sq = queries[order], items[order], dist_sq[order]
+        first = np.flatnonzero(np.diff(queries, prepend=-1) != 0)
+        targets[start+queries[first]] = items[first]
+        in_reach[start+queries[first]] = dist_sq[first]<=reach**2
+    return targets, in_reach
+
+def food_steering(pos, rows, corpse_pos, food):
+    # direction from each of rows to its corpse in food, see corpses_in_sight
+    # returns the directions and the mask of the rows they are for
+    found = food != -1
+    rows = rows[found]
+    food = food[found]
+    angles = np.arctan2(corpse_pos[food, 1]-pos[rows, 1], corpse_pos[food, 0]-pos[rows, 0])
+    return np.stack([np.cos(angles), np.sin(angles)], axis=1), found
 
 class Corpses:
+    # numeric corpse data lives in numpy columns like Entities, the rest in
+    # lists kept in step with them. eaten corpses are swap-removed
+    pos = Column()
+    nutrients = Column()
+
     def __init__(self):
-        self.pos = []
-        self.nutrients = []
+        self.columns = ColumnStore({
+            'pos': ((4,), np.float64),
+            'nutrients': ((), np.float64),
+        })
         self.materials = []
         self.creature = []
-        self.type = []
+        self.digestion = []
+        # corpses don't move, so the index is only rebuilt when one is added or removed
+        self.grid = SpatialHash(GRID_CELL_SIZE)
+
+    def __len__(self):
+        return len(self.columns)
 
     def add_new_corpse(self, corpse_data):
-        self.pos.append(corpse_data['pos'])
-        self.nutrients.append(corpse_data['nutrients'])
+        self.columns.append({
+            'pos': corpse_data['pos'],
+            'nutrients': corpse_data['nutrients'],
+        })
         self.materials.append(corpse_data['materials'])
         self.creature.append(corpse_data['creature'])
         self.digestion.append(corpse_data['digestion'])
+        self.grid.invalidate()
     
-    def render(self, screen, camera):
-        for pos in self.pos:
-            pg.draw.circle(screen, (255, 0, 0), camera.transform_to_screen(pos[0:3]), 10)
+    def render(self, render_queue):
+        if len(self):
+            render_queue.circles(self.pos[:, :3], 10, (255, 0, 0))
+
+    def index(self):
+        # the grid over the corpses, rebuilt if corpses were added or removed
+        if self.grid.stale:
+            self.grid.rebuild(self.pos)
+        return self.grid
     
+    def neighbours(self, x, y, radius):
+        return self.index().query_radius(x, y, radius)
+
+    def nearest(self, x, y, k, max_radius=np.inf):
+        # indices of the k corpses closest to (x, y), nearest first
+        return self.index().k_nearest(x, y, k, max_radius)
+
     def update(self):
         self.remove()
 
     def remove(self):
-        to_remove = []
-        for i in range(len(self.nutrients)):
-            if self.nutrients[i]==0:
-                to_remove.append(i)
-        
-        to_remove.reverse()
-        
-        for rmv in to_remove:
-            self.pos[rmv:rmv+1] = []
-            self.nutrients[rmv:rmv+1] = []
-            self.creature[rmv:rmv+1] = []
\ No newline at end of file
+        # from the back so that the corpse swapped into a removed slot has
+        # already been checked
+        for i in np.flatnonzero(self.nutrients==0)[::-1]:
+            self.columns.swap_remove(i)
+            for column in [self.materials, self.creature, self.digestion]:
+                swap_pop(column, i)
+            self.grid.invalidate()
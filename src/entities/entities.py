@@ -1,12 +1,19 @@
-import pygame as pg
-from math import atan2, cos, sin, sqrt, pi, exp
+import numpy as np
+from math import atan2, cos, sin, pi, exp
 from src.combat.abilities import BASE_AOE_RADIUS
-from src.combat.status_effects import MOVEMENT_IMPAIR_EFFECTS
-from src.util.settings import WIDTH, MAX_SIZE, MIN_SIZE, MAX_NUM_PARTS
-from src.util.physics import new_vel, angles_between
+from src.combat.world_event import QUEST_MASKS, quest_masks
+from src.combat.status_effects import STATUS_EFFECTS, STATUS_BIT, STATUS_INDEX, NUM_STATUS_EFFECTS, MOVEMENT_IMPAIR_MASK, MOVEMENT_IMPAIR_COUNT
+from src.util.settings import MAX_SIZE, MIN_SIZE, MAX_NUM_PARTS, GRID_CELL_SIZE, SPARSE_BEHAVIOUR_CREATURES
+from src.util.settings import LOD_NEAR, LOD_MID, LOD_FAR, LOD_NEAR_RADIUS, LOD_MID_RADIUS, LOD_AI_INTERVALS, LOD_STEP_INTERVALS
+from src.util.physics import new_vels, angles_between
 from src.models.creature import Creature
+from src.models.skeletons import Skeletons
+from src.models.legs import leg_joint_positions
 from src.models.traits import Traits
-from src.models.behaviour import Behaviour
+from src.models.behaviour import Behaviours, SparseBehaviours
+from src.util.column_store import ColumnStore, Column, Handles, swap_pop
+from src.util.spatial_hash import SpatialHash
+from src.entities.threat_lists import ThreatLists
 
 sigmoid = lambda a, x, c: round(a / (1+exp(-x)) + c)
 sum_stats = lambda entities, index, stats : sum([entities.stats[index][stat_type] for stat_type in stats])
@@ -26,179 +33,352 @@ ENTITY_CALCULATIONS = {
     'max_size': (lambda entities, index : sigmoid(2*MAX_SIZE, entities.creature[index].size/MAX_SIZE, 0)),
     'min_size': (lambda entities, index : MIN_SIZE),
     'max_parts': (lambda entities, index : sigmoid(MAX_NUM_PARTS, entities.creature[index].max_parts-MAX_NUM_PARTS+entities.consumed[index], 0)),
+    'mass': (lambda entities, index : entities.creature[index].num_parts*entities.creature[index].size/10),
+    # how far the body can trail behind the head
+    'reach': (lambda entities, index : entities.creature[index].size*(2*entities.creature[index].num_parts+3)),
 }
 
+# column of each calculation in Entities.calculations
+CALCULATION_INDEX = {calculation: i for i, calculation in enumerate(ENTITY_CALCULATIONS)}
+
 class Entities:
+    # numeric per-entity data lives in preallocated numpy columns
+    # so that the per-tick integration runs as array operations
+    pos = Column()
+    prev_pos = Column()
+    vel = Column()
+    spd = Column()
+    acc = Column()
+    scale = Column()
+    health = Column()
+    energy = Column()
+    consumed = Column()
+    handle = Column()
+    calculations = Column()
+    dirty = Column()
+    status = Column()
+    status_start = Column()
+    status_cd = Column()
+    status_source = Column()
+    cooldowns = Column()
+    lod = Column()
+    lod_dt = Column()
+    ai_step = Column()
+    steering = Column()
+    quest_mask = Column()
+    quest_dirty = Column()
+
     ############################# 
     # init and spawning         #
     ############################# 
-    def __init__(self):
+    def __init__(self, sparse_behaviours=False):
+        self.columns = ColumnStore({
+            # physical/render data
+            'pos': ((4,), np.float64),      # [x, y, z, a]
+            'prev_pos': ((4,), np.float64), # pos before the last step, for interpolation
+            'vel': ((3,), np.float64),      # [x, y, z]
+            'spd': ((), np.float64),
+            'acc': ((), np.float64),
+            'scale': ((), np.int32),
+            # game data
+            'health': ((), np.float64),
+            'energy': ((), np.float64),
+            'consumed': ((), np.int32),
+            # stable id of the entity, see Entities.slot
+            'handle': ((), np.int64),
+            # cached ENTITY_CALCULATIONS, only recomputed for dirty entities
+            'calculations': ((len(ENTITY_CALCULATIONS),), np.float64),
+            'dirty': ((), np.bool_),
+            # status effects, one bit per effect in STATUS_EFFECTS and the
+            # start time, cooldown and source handle of each effect
+            'status': ((), np.int64),
+            'status_start': ((NUM_STATUS_EFFECTS,), np.float64),
+            'status_cd': ((NUM_STATUS_EFFECTS,), np.float64),
+            'status_source': ((NUM_STATUS_EFFECTS,), np.int64),
+            # abilities on cooldown, one bit per ability in ALL_ABILITIES
+            'cooldowns': ((), np.int64),
+            # level of detail tier by distance from the camera, see move,
+            # and the dt built up since the entity was last stepped
+            'lod': ((), np.int8),
+            'lod_dt': ((), np.float64),
+            # step of the last ai decision and the screen space input it
+            # chose, steered with until the next one, see AIScheduler
+            'ai_step': ((), np.int64),
+            'steering': ((2,), np.float64),
+            # the quests open to the entity as the bitsets of QUEST_MASKS,
+            # only recomputed for entities marked dirty since, see quest_masks
+            'quest_mask': ((len(QUEST_MASKS),), np.int64),
+            'quest_dirty': ((), np.bool_),
+        })
+        self.handles = Handles()
+        # simulation steps taken, the clock of the ai decisions
+        self.steps = 0
+        # spatial index over pos, shared by every proximity check
+        self.grid = SpatialHash(GRID_CELL_SIZE)
+        # who each entity chases or flees from, kept up to date with the grid
+        self.threats = ThreatLists()
+
         # physical/render data
-        self.pos = []            
-        self.vel = []  
-        self.spd = []     
-        self.acc = []          
         self.creature = []     
-        self.scale = [] 
+        # every creature's skeleton, updated in one batch by move
+        self.skeletons = Skeletons()
 
         # game data
         self.stats = [] 
-        self.health = []
-        self.energy = []    
 
         self.abilities = []      
-        self.status_effects = []   
         self.traits = []        
         self.hurt_box = []      
         self.quests = []    
-        self.consumed = []
         self.digestion = []
 
-        self.behaviours = []    
+        # aggression and herding between every pair of entities
+        self.behaviours = SparseBehaviours() if sparse_behaviours else Behaviours()
     
     def add_new_entity(self, entity_data, stats):
+        capacity = self.columns.capacity
+        index = self.columns.append({
+            'pos': entity_data['pos'],
+            'spd': entity_data['spd'],
+            'acc': entity_data['acc'],
+            'scale': entity_data['scale'],
+            'health': stats['hp'],
+            'dirty': True,
+            'quest_dirty': True,
+            # due a decision straight away
+            'ai_step': self.steps-LOD_AI_INTERVALS[LOD_FAR],
+        })
+        self.handle[index] = self.handles.new(index)
+        self.grid.invalidate()
+        self.threats.invalidate()
+        if self.columns.capacity != capacity:
+            # the columns were reallocated, point the creatures at the new rows
+            self.bind_creatures()
+
         # physical/render data
-        self.pos.append(entity_data['pos']) # [x, y, z, a]
-        self.vel.append([0, 0, 0])          # [x, y, z]
-        self.spd.append(entity_data['spd'])
-        self.acc.append(entity_data['acc'])
         self.creature.append(Creature(num_parts=entity_data['body_parts'], 
-                                      pos=entity_data['pos'], 
+                                      pos=self.pos[index], 
                                       size=entity_data['size'], 
                                       max_parts=entity_data['max_parts'],
                                       num_pair_legs=entity_data['num_legs'],
                                       leg_length=entity_data['leg_length']))
-        self.scale.append(entity_data['scale'])
+        self.skeletons.add(self.creature[index])
+        self.prev_pos[index] = self.pos[index]
 
         # game data
         self.stats.append(stats)
-        self.health.append(stats['hp'])
-        self.energy.append(self.entity_calculation(len(self.energy), 'energy')) # energy calculation
         
         self.abilities.append(entity_data['abilities'])
-        self.status_effects.append({
-            'effects': [],
-            'cd': [],
-            'time': [],
-            'source': [],
-        })
         self.traits.append(Traits([], stats['min'], stats['max']))
         for trait in entity_data['traits']:
-            index = len(self.traits)-1
             self.traits[index].give_traits(self.creature[index], trait)
         self.hurt_box.append(None)
         self.quests.append({}) # TODO: save data
-        self.consumed.append(0) # TODO: save data
         self.digestion.append('inorganic') # TODO: save data
+        self.energy[index] = self.entity_calculation(index, 'energy') # energy calculation
 
-        self.behaviours.append(Behaviour({
-            'aggression': entity_data['aggression'],
-            'herding': entity_data['herd']
-        }))
+        behaviours = self.behaviours
+        if isinstance(behaviours, Behaviours) and len(behaviours) == behaviours.capacity >= SPARSE_BEHAVIOUR_CREATURES:
+            # the matrices would double past the dense limit
+            self.behaviours = behaviours.to_sparse()
+        self.behaviours.add(entity_data['aggression'], entity_data['herd'])
 
-        for i in range(len(self.behaviours)):
-            self.behaviours[i].update_aggression(len(self.creature)-1, 0)
-            self.behaviours[i].update_herd_behaviour(len(self.creature)-1, 0)
+    def slot(self, handle):
+        # current index of the entity with the given handle, None if it died
+        return self.handles.slot(handle)
+
+    def bind_creatures(self):
+        # creatures hold a view of their entity's position row as their head
+        for i in range(len(self.creature)):
+            self.creature[i].head = self.pos[i]
 
     ############################# 
     # draw, update, movement    #
     ############################# 
-    def render(self, screen, camera):
-        for i in range(len(self.creature)):
-            dx = self.pos[i][0]-camera.pos[0]
-            dy = self.pos[i][1]-camera.pos[1]
-            if sqrt(dx**2+dy**2)<=WIDTH/2 and abs(self.scale[i] - camera.scale) <= 2:
-                self.creature[i].render(screen, camera)
+    def render(self, render_queue, camera, alpha=1):
+        # only near entities have an up to date model, the render queue
+        # culls the projected primitives
+        visible = np.flatnonzero((self.lod==LOD_NEAR) & (np.abs(self.scale-camera.scale)<=2))
+
+        # solve the leg joints of every visible creature in one batch
+        feet = []
+        bodies = []
+        bends = []
+        leg_lengths = []
+        num_joints = []
+        for i in visible:
+            legs = self.creature[i].legs
+            leg_feet, leg_bodies, leg_bends = legs.joint_requests(self.creature[i].skeleton)
+            feet.extend(leg_feet)
+            bodies.extend(leg_bodies)
+            bends.extend(leg_bends)
+            leg_lengths.extend([legs.leg_length]*len(leg_bends))
+            num_joints.append(len(leg_bends))
+        joints = leg_joint_positions(feet, bodies, leg_lengths, bends)
+
+        # creatures are drawn alpha of the way from their previous step to
+        # their current one, by shifting the whole model
+        offsets = (self.prev_pos[:, :3]-self.pos[:, :3])*(1-alpha)
+        start = 0
+        for i, count in zip(visible, num_joints):
+            render_queue.offset = offsets[i]
+            self.creature[i].render(render_queue, joints[start:start+count])
+            start+=count
             # if self.hurt_box[i]:
             #     self.hurt_box[i].render(screen, camera)
+        render_queue.offset = np.zeros(3)
+
+    def update(self, camera, dt, time):
+        rows, row_dt = self.step_rows(dt)
+        self.spend_energy(rows, row_dt)
+        self.move(camera, rows, row_dt, time)
+        self.update_grid()
+
+    def step_rows(self, dt):
+        # the entities whose position and energy are stepped this step and
+        # the dt each built up since its last step, see LOD_STEP_INTERVALS
+        # far entities are staggered by handle to spread them over the interval
+        self.lod_dt+=dt
+        intervals = np.array(LOD_STEP_INTERVALS)[self.lod]
+        rows = np.flatnonzero((self.steps+self.handle)%intervals == 0)
+        row_dt = self.lod_dt[rows]
+        self.lod_dt[rows] = 0
+        return rows, row_dt
+
+    def update_grid(self):
+        self.threats.moved(self, self.grid.update(self.pos))
+
+    def index(self):
+        # the grid over the entities, brought up to date if they were added
+        # or removed since
+        if self.grid.stale:
+            self.grid.update(self.pos)
+        return self.grid
+
+    def neighbours(self, x, y, radius):
+        # indices of the entities within radius of (x, y) in the xy plane
+        return self.index().query_radius(x, y, radius)
+
+    def nearest(self, x, y, k, max_radius=np.inf):
+        # indices of the k entities closest to (x, y), nearest first
+        return self.index().k_nearest(x, y, k, max_radius)
 
-    def update(self, camera, dt):
-        self.spend_energy(dt)
-        self.move(camera, dt)
+    def has_status(self, index, effect):
+        return bool(self.status[index] & STATUS_BIT[effect])
+
+    def status_effects(self, index):
+        # names of the effects on the entity, in STATUS_EFFECTS order
+        status = self.status[index]
+        return [effect for effect in STATUS_EFFECTS if status & STATUS_BIT[effect]]
 
     def parse_input(self, mv_input, camera, dt):
+        self.steer(np.array([mv_input['i']]), np.array([mv_input['x']]), np.array([mv_input['y']]), camera, dt)
 
-        index = mv_input['i']
-        x_i = mv_input['x']
-        y_i = mv_input['y']
-        if 'ability_lock' in self.status_effects[index]['effects']:
-            x_i, y_i = 0, 0
-        
+    def steer(self, indices, x_i, y_i, camera, dt):
+        # movement input of many entities applied at once, x_i and y_i are
+        # the screen space input of each of indices
+        status = self.status[indices]
+        locked = (status & STATUS_BIT['ability_lock']) != 0
         # entity is stunned cannot move
-        if 'stunned' in self.status_effects[index]['effects']:
-            x_i, y_i = 0, 0
+        held = locked | ((status & STATUS_BIT['stunned']) != 0)
+        x_i = np.where(held, 0, x_i)
+        y_i = np.where(held, 0, y_i)
 
         # entity movement
-        x_dir, y_dir = camera.screen_to_world(x_i, y_i)
-
-        for j in range(len(self.status_effects[index]['effects'])):
-            if self.status_effects[index]['effects'][j] == 'intimidated':
-                source = self.status_effects[index]['source'][j]
-                angle = angles_between(self.pos[source], self.pos[index])['z']
-                x_dir, y_dir = cos(angle+pi), sin(angle+pi)
-
-        self.vel[index][0] = new_vel(self.acc[index], self.vel[index][0], x_dir, dt)
-        self.vel[index][1] = new_vel(self.acc[index], self.vel[index][1], y_dir, dt)
-
-        if 'ability_lock' not in self.status_effects[index]['effects']:
-            if self.vel[index][0]**2 + self.vel[index][1]**2 > self.spd[index]**2:
-                # normalize the speed
-                angle = atan2(y_dir, x_dir)
-                self.vel[index][0] = self.spd[index]*cos(angle)
-                self.vel[index][1] = self.spd[index]*sin(angle)
-
-        for impair in MOVEMENT_IMPAIR_EFFECTS:
-            if impair in self.status_effects[index]['effects']:
-                self.vel[index][0] *= 0.8
-                self.vel[index][1] *= 0.8
-                # cumulative 20% reduction to movement speed if
-                # entity is bleeding, poisoned, or weakened
+        dirs = camera.screen_to_world_batch(x_i, y_i)
+        x_dir, y_dir = dirs[:, 0], dirs[:, 1]
+
+        for k in np.flatnonzero(status & STATUS_BIT['intimidated']):
+            index = indices[k]
+            source = self.slot(self.status_source[index, STATUS_INDEX['intimidated']])
+            if source is None:
+                continue
+            angle = angles_between(self.pos[source], self.pos[index])['z']
+            x_dir[k], y_dir[k] = cos(angle+pi), sin(angle+pi)
+
+        acc = self.acc[indices]
+        vel_x = new_vels(acc, self.vel[indices, 0], x_dir, dt)
+        vel_y = new_vels(acc, self.vel[indices, 1], y_dir, dt)
+
+        # normalize the speed
+        spd = self.spd[indices]
+        fast = ~locked & (vel_x**2+vel_y**2 > spd**2)
+        angle = np.arctan2(y_dir[fast], x_dir[fast])
+        vel_x[fast] = spd[fast]*np.cos(angle)
+        vel_y[fast] = spd[fast]*np.sin(angle)
+
+        # cumulative 20% reduction to movement speed if
+        # entity is bleeding, poisoned, or weakened
+        impaired = np.take(MOVEMENT_IMPAIR_COUNT, status & MOVEMENT_IMPAIR_MASK)
+        self.vel[indices, 0] = vel_x*0.8**impaired
+        self.vel[indices, 1] = vel_y*0.8**impaired
    
-    def move(self, camera, dt):
-        for i in range(len(self.pos)):
-            self.pos[i][0]+=self.vel[i][0]*dt
-            self.pos[i][1]+=self.vel[i][1]*dt
-            # angle the creature is facing
-            if self.vel[i][0]**2+self.vel[i][1]**2!=0:
-                self.pos[i][3] = atan2(self.vel[i][1], self.vel[i][0])
-
-            # check if the entity is in bounds to
-            # see if updating the model is necessary
-            dx = self.pos[i][0]-camera.pos[0]
-            dy = self.pos[i][1]-camera.pos[1]
-            if sqrt(dx**2+dy**2)<=WIDTH/2:
-                self.creature[i].move(self.pos[i], {
-                    'effects': self.status_effects[i]['effects'], 
-                    'time': self.status_effects[i]['time']
-                }, self.vel[i][0]**2 + self.vel[i][1]**2 != 0)
+    def move(self, camera, rows, dt, time):
+        # moves rows by their dt, see step_rows
+        # time is the simulation time in ms
+        self.prev_pos = self.pos
+        pos = self.pos
+        vel = self.vel
+        pos[rows, :2]+=vel[rows, :2]*dt[:, None]
+        # angle the creature is facing
+        moving = (vel[:, 0]**2+vel[:, 1]**2)!=0
+        turned = rows[moving[rows]]
+        pos[turned, 3] = np.arctan2(vel[turned, 1], vel[turned, 0])
+
+        # only the models of the entities near the camera are updated, the
+        # ones coming back into view were left behind and start over
+        prev_lod = self.update_lod(camera)
+        in_bounds = np.flatnonzero(self.lod==LOD_NEAR)
+        for i in in_bounds[prev_lod[in_bounds]!=LOD_NEAR]:
+            self.creature[i].rebuild_model()
+        self.skeletons.follow(in_bounds, pos[in_bounds])
+        for i in in_bounds:
+            self.creature[i].legs.move_feet(self.creature[i].skeleton, {
+                'status': self.status[i], 
+                'time': self.status_start[i]
+            }, time)
+        self.skeletons.wiggle(in_bounds[moving[in_bounds]], time)
+        self.steps+=1
+
+    def update_lod(self, camera):
+        # tier of every entity by its distance from the camera, returns the
+        # tiers they were in before
+        prev_lod = self.lod.copy()
+        sq_dist = (self.pos[:, 0]-camera.pos[0])**2+(self.pos[:, 1]-camera.pos[1])**2
+        self.lod = np.where(sq_dist<=LOD_NEAR_RADIUS**2, LOD_NEAR,
+                            np.where(sq_dist<=LOD_MID_RADIUS**2, LOD_MID, LOD_FAR))
+        return prev_lod
+
+    def ai_intervals(self):
+        # steps between the ai updates of each entity
+        return np.array(LOD_AI_INTERVALS)[self.lod]
     
-    def spend_energy(self, dt):
-        for i in range(len(self.energy)):
-            spd_sq = (self.vel[i][0]**2 + self.vel[i][1]**2 + self.vel[i][2]**2)/1000
-            mass = self.creature[i].num_parts*self.creature[i].size/10
-            energy_spent = 1/2*mass*spd_sq
-            if self.energy[i]<=0:
-                # self.health[i]-=energy_spent*dt
-                ...
-            else:
-                self.energy[i]-=energy_spent*dt
-            total_energy = self.entity_calculation(i, 'energy')
-            if self.energy[i]>total_energy:
-                self.energy[i] = total_energy
+    def spend_energy(self, rows, dt):
+        # drains rows for their dt, see step_rows
+        energy = self.energy[rows]
+        vel = self.vel[rows]
+        spd_sq = (vel[:, 0]**2 + vel[:, 1]**2 + vel[:, 2]**2)/1000
+        mass = self.calculation_column('mass')[rows]
+        energy_spent = 1/2*mass*spd_sq
+        # entities without energy left do not drain any further
+        has_energy = energy>0
+        energy[has_energy]-=energy_spent[has_energy]*dt[has_energy]
+        total_energy = self.calculation_column('energy')[rows]
+        self.energy[rows] = np.minimum(energy, total_energy)
 
     ####
     def kill(self, player, corpses):
-        remove = []
-        for i in range(len(self.health)):
-            if self.health[i]<=0:
-                remove.append(i)
+        remove = np.flatnonzero(self.health<=0).tolist()
         
         if player in remove:
             return True
 
+        # remove from the back so that the row swapped into a removed slot
+        # is always a living entity, the player sits in slot 0 and is never
+        # moved by a swap while it is alive
         for j in range(len(remove)-1, -1, -1):
             i = remove[j]
-            pos = self.pos[i]
+            pos = self.pos[i].copy()
             pos[2] = 0
             corpse_data = {
                 'pos': pos,
@@ -210,22 +390,25 @@ class Entities:
                 'digestion': 'inorganic' # TODO: change dynamically
             }
             corpses.add_new_corpse(corpse_data)
-            self.pos[i:i+1] = []
-            self.vel[i:i+1] = []
-            self.spd[i:i+1] = []
-            self.acc[i:i+1] = []
-            self.creature[i:i+1] = []
-            self.stats[i:i+1] = []
-            self.health[i:i+1] = []
-            self.energy[i:i+1] = []
-            self.abilities[i:i+1] = []
-            self.status_effects[i:i+1] = []
-            self.traits[i:i+1] = []
-            self.hurt_box[i:i+1] = []
-            self.behaviours[i:i+1] = []
+            self.remove_entity(i)
 
         return False
 
+    def remove_entity(self, i):
+        self.handles.release(self.handle[i])
+        last = self.columns.swap_remove(i)
+        self.skeletons.swap_remove(i)
+        self.grid.invalidate()
+        self.threats.invalidate()
+        for column in [self.creature, self.stats, self.abilities, 
+                       self.traits, self.hurt_box, self.quests, self.digestion]:
+            swap_pop(column, i)
+        self.behaviours.remove(i)
+        if i != last:
+            self.handles.move(self.handle[i], i)
+            self.creature[i].head = self.pos[i]
+
+
     def consume(self, index, target_index, corpses):
         if self.digestion[index] == corpses.digestion[target_index]:
             self.energy[index] += corpses.nutrients[target_index]
@@ -234,14 +417,44 @@ class Entities:
 
         corpses.nutrients[target_index] = 0
         self.consumed[index] += 1
+        self.mark_dirty(index)
         print(f'consumed')
     
     def scavenge(self, index, target_index, corpses):
         ...
 
     def entity_calculation(self, index, calculation):
-        fn = ENTITY_CALCULATIONS[calculation]
-        return fn(self, index)
+        if self.dirty[index]:
+            self.calculate(index)
+        return self.calculations[index, CALCULATION_INDEX[calculation]]
+
+    def calculation_column(self, calculation):
+        # the cached calculation for every entity
+        for index in np.flatnonzero(self.dirty):
+            self.calculate(index)
+        return self.calculations[:, CALCULATION_INDEX[calculation]]
+
+    def calculate(self, index):
+        calculations = self.calculations[index]
+        for i, fn in enumerate(ENTITY_CALCULATIONS.values()):
+            calculations[i] = fn(self, index)
+        self.dirty[index] = False
+
+    def mark_dirty(self, index):
+        # call whenever the stats, body or consumption of an entity change
+        self.dirty[index] = True
+        self.quest_dirty[index] = True
+        # awareness may have changed
+        self.threats.mark(index)
+
+    def quest_masks(self, index):
+        # the quest bitsets of the entity, those of every entity that changed
+        # since they were last worked out are redone together first
+        if self.quest_dirty.any():
+            dirty = np.flatnonzero(self.quest_dirty)
+            self.quest_mask[dirty] = quest_masks(self, dirty)
+            self.quest_dirty[dirty] = False
+        return self.quest_mask[index]
 
     def health_and_energy_ratios(self, index):
         energy_ratio = self.energy[index]/self.entity_calculation(index, 'energy') * 100
@@ -249,17 +462,6 @@ class Entities:
         
         return [health_ratio, energy_ratio]
 
-    def interact_calculation(self, index, index_preset, target, target_preset):
-        calc = 0
-        calc += self.entity_calculation(index, index_preset)
-        calc -= self.entity_calculation(target, target_preset)
-        return calc
-
-    def get_entity_quest_data(self, index):
-        data = self.get_entity_data(index)
-
-        return data
-
     def get_entity_data(self, index):
 
         return {
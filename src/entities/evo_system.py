@@ -37,8 +37,8 @@ class EvoSystem:
                 'max_parts': int(self.entities.creature[i].max_parts),
                 'num_legs': int(self.entities.creature[i].legs.num_pair_legs),
                 'leg_length': int(self.entities.creature[i].legs.leg_length),
-                'aggression': self.entities.behaviours[i].aggression.copy(),
-                'herd': self.entities.behaviours[i].herding.copy(),
+                'aggression': self.entities.behaviours.row('aggression', i),
+                'herd': self.entities.behaviours.row('herding', i),
                 'abilities': self.entities.abilities[i].copy(),
                 'traits': self.entities.traits[i].traits.copy()
             }
@@ -81,6 +81,7 @@ class EvoSystem:
         if self.entities.traits[index].new_trait['level'] == TRAIT_AND_BODY_LEVELS['max']:
             self.entities.traits[index].give_traits(self.entities.creature[index], trait['reward'])
             self.entities.traits[index].new_trait = {}
+        self.entities.mark_dirty(index)
 
     def allocate_stat(self, index, stat):
         self.entities.stats[index]['max'][stat]+=1
@@ -99,16 +100,17 @@ class EvoSystem:
                 self.entities.stats[i][decrease] = self.entities.traits[i].min_stats[decrease]*STAT_GAP
             if self.entities.stats[i][increase]>self.entities.traits[i].max_stats[increase]*STAT_GAP:
                 self.entities.stats[i][increase] = self.entities.traits[i].max_stats[increase]*STAT_GAP
-            
-            self.entities.spd[i] = self.entities.detailed_calculation(i, 'movement', [lambda calc : log(calc**2)])
 
             # randomly increase/decrease size
             size_change = uniform(-2, 2)
             self.entities.creature[i].change_body(size_change)
+            self.entities.mark_dirty(i)
+
+            self.entities.spd[i] = log(self.entities.entity_calculation(i, 'movement')**2)
 
     def behaviour_shift(self):
-        for behaviour in self.entities.behaviours:
-            behaviour.shift()
+        self.entities.behaviours.shift()
+        self.entities.threats.invalidate()
 
     def change_physiology(self, type, index):
         if type == 'new_parts':
@@ -142,4 +144,5 @@ class EvoSystem:
                 self.give_abilities(index, reward)
             case 'physiology':
                 self.change_physiology(reward, index)
+        self.entities.mark_dirty(index)
         self.entities.energy[index] -= 1
\ No newline at end of file
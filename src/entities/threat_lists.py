@@ -0,0 +1,147 @@
+import numpy as np
+from math import pi
+from src.util.settings import THREAT_LIST_SIZE
+from src.util.spatial_hash import ranks
+
+# most lists reranked at once, bounds the aggression pairs held in memory
+RANK_CHUNK = 1024
+
+class ThreatLists:
+    # the k entities each entity cares most about, threats (negative
+    # aggression) and prey (positive aggression) alike, ranked by
+    # |aggression| x proximity among the entities within its awareness
+    # an entity's list is only reranked when its aggression scores change or
+    # when it or an entity within awareness of it changes grid cell,
+    # picking a target then only looks at the k entries of the list
+    def __init__(self, k=THREAT_LIST_SIZE):
+        self.k = k
+        self.targets = np.full((0, k), -1, dtype=np.int64) # indices, -1 pads
+        self.dirty = np.zeros(0, dtype=np.bool_)
+        self.stale = True
+
+    def invalidate(self):
+        # call when entities are added or removed, every list is reranked
+        self.stale = True
+
+    def mark(self, indices):
+        # rerank the lists of the given entities
+        if not self.stale:
+            self.dirty[indices] = True
+
+    def moved(self, entities, moved):
+        # the entities that changed grid cell and those that can see them
+        if self.stale or not len(moved):
+            return
+        if len(moved)*4 >= len(self.dirty):
+            self.dirty[:] = True
+            return
+        awareness = entities.calculation_column('awareness').max(initial=0)
+        self.dirty[moved] = True
+        for j in moved:
+            self.dirty[entities.neighbours(entities.pos[j][0], entities.pos[j][1], awareness)] = True
+
+    def prepare(self, entities):
+        # resizes the lists after entities were added or removed, every list
+        # is reranked then
+        n = len(entities.pos)
+        if self.stale or len(self.dirty) != n:
+            self.targets = np.full((n, self.k), -1, dtype=np.int64)
+            self.dirty = np.ones(n, dtype=np.bool_)
+            self.stale = False
+
+    def refresh(self, entities, rows=None):
+        # reranks the dirty lists among rows, all of them if rows is None
+        self.prepare(entities)
+        if rows is None:
+            rows = np.arange(len(entities.pos))
+        awareness = entities.calculation_column('awareness')
+        dirty = rows[self.dirty[rows]]
+        for start in range(0, len(dirty), RANK_CHUNK):
+            chunk = dirty[start:start+RANK_CHUNK]
+            self.targets[chunk] = rank_targets(awareness[chunk], *self.candidates(entities, chunk), self.k)[0]
+        self.dirty[rows] = False
+
+    def candidates(self, entities, rows):
+        # candidate_pairs of rows and the aggression of each row towards
+        # the other of its pairs
+        queries, others, dist_sq = candidate_pairs(entities.index(), entities.pos,
+                                                   entities.calculation_column('awareness'), rows)
+        aggression = entities.behaviours.pair_scores('aggression', rows[queries], others)
+        return queries, others, dist_sq, aggression
+
+    def select(self, entities, rows=None):
+        # the highest priority target of each of rows (every entity if None),
+        # see best_targets
+        if rows is None:
+            rows = np.arange(len(entities.pos))
+        self.refresh(entities, rows)
+        targets = self.targets[rows]
+        aggression = entities.behaviours.pair_scores('aggression', rows[:, None], np.where(targets >= 0, targets, 0))
+        return best_targets(entities.pos, entities.calculation_column('awareness'),
+                            entities.calculation_column('stealth'), rows, targets, aggression)
+
+def best_targets(pos, awareness, stealth, rows, targets, aggression):
+    # the highest priority of the listed targets of each of rows that is
+    # close enough to chase or flee from, -1 where there is none
+    # targets and aggression are the threat lists of rows and the
+    # aggression of each row towards them
+    # returns the target, aggression towards it, distance to it and
+    # awareness of it (the entity's awareness less the target's stealth)
+    valid = targets >= 0
+    targets = np.where(valid, targets, 0)
+    dist = np.sqrt((pos[targets, 0]-pos[rows, None, 0])**2+(pos[targets, 1]-pos[rows, None, 1])**2)
+    awareness = awareness[rows]
+    reach = awareness[:, None]-stealth[targets]
+    engaged = valid & (aggression != 0) & (dist <= reach*np.abs(aggression))
+    priority = np.where(engaged, np.abs(aggression)*(1-dist/awareness[:, None]), -np.inf)
+    best = np.argmax(priority, axis=1)
+    k = np.arange(len(rows))
+    found = engaged[k, best]
+    return (np.where(found, targets[k, best], -1), aggression[k, best],
+            dist[k, best], reach[k, best])
+
+def candidate_pairs(grid, pos, awareness, rows):
+    # every (row, other) pair with other within awareness of rows[row] and
+    # their squared distance, grid is the SpatialHash over pos
+    queries, others, dist_sq = grid.query_radius_batch(pos[rows, :2], awareness[rows])
+    keep = others != rows[queries]
+    return queries[keep], others[keep], dist_sq[keep]
+
+def rank_targets(awareness, queries, others, dist_sq, aggression, k):
+    # the threat lists of the rows whose candidates are given, see
+    # ThreatLists.candidates, with awareness the awareness of each row
+    # returns the (rows, k) lists, -1 padded, and the aggression of each
+    # row towards its listed entities
+    n = len(awareness)
+    scored = aggression != 0
+    queries, others, dist_sq, aggression = queries[scored], others[scored], dist_sq[scored], aggression[scored]
+    priority = np.abs(aggression)*(1-np.sqrt(dist_sq)/awareness[queries])
+    order = np.lexsort((-priority, queries))
+    queries, others, aggression = queries[order], others[order], aggression[order]
+    rank = ranks(np.bincount(queries, minlength=n))
+    top = rank < k
+    targets = np.full((n, k), -1, dtype=np.int64)
+    scores = np.zeros((n, k))
+    targets[queries[top], rank[top]] = others[top]
+    scores[queries[top], rank[top]] = aggression[top]
+    return targets, scores
+
+def chase_steering(pos, rows, targets, aggression):
+    # direction towards each of rows' target, or away from it if it is a
+    # threat, targets and aggression as returned by best_targets
+    # returns the directions and the mask of the rows they are for
+    found = targets != -1
+    rows = rows[found]
+    targets = targets[found]
+    angles = np.arctan2(pos[targets, 1]-pos[rows, 1], pos[targets, 0]-pos[rows, 0])
+    angles[aggression[found]<0]+=pi
+    return np.stack([np.cos(angles), np.sin(angles)], axis=1), found
+
+def attack_angles(pos, rows, targets, aggression, dist, reach):
+    # angle at which each of rows attacks its target, nan if the target is
+    # not prey or not yet within half of the chase range
+    # targets and the rest as returned by best_targets
+    attack = (targets != -1) & (aggression>0) & (dist<=reach*aggression/2)
+    targets = np.where(attack, targets, rows)
+    angles = np.arctan2(pos[targets, 1]-pos[rows, 1], pos[targets, 0]-pos[rows, 0])
+    return np.where(attack, angles, np.nan)
@@ -1,115 +1,158 @@
-from math import cos, sin, pi
-from random import choice, randint
+import numpy as np
+from collections import deque
+from math import pi
+from random import choice
 from src.combat.abilities import ALL_ABILITIES
 from src.combat.world_event import WorldEvent
+from src.game_state.ai_scheduler import AIScheduler
+from src.game_state.ai_workers import AIWorkers, plan_steering
+from src.entities.corpse import corpses_in_sight, food_steering
 
-from src.util.physics import dist_between, angles_between
+from src.util.settings import LOD_FAR, AI_BUDGET_MS, AI_BATCH_SIZE, AI_WORKERS, AI_WORKER_BATCH_SIZE
+
+# creatures see corpses within FOOD_AWARENESS and eat those within FEED_RANGE
+FOOD_AWARENESS = 500
+FEED_RANGE = 100
 
 class AIController:
-    def __init__(self, non_controllable):
+    def __init__(self, non_controllable, budget_ms=AI_BUDGET_MS, num_workers=AI_WORKERS):
         self.non_controllable = non_controllable
+        # worker processes that share the planning of large batches
+        self.workers = AIWorkers(num_workers) if num_workers else None
+        # decides which creatures think this step, see AIScheduler
+        self.scheduler = AIScheduler(budget_ms, AI_WORKER_BATCH_SIZE if num_workers else AI_BATCH_SIZE)
+        # (creatures, attack_angles of them) of each batch decided this step
+        self.decisions = []
+        # handles of the creatures yet to accept this generation's quests
+        self.quest_queue = deque()
 
     def movement_input(self, entities, corpses, camera, dt):
-        for i in range(len(entities.pos)):
-            if i!=self.non_controllable:
-                # give the ai controlled creature some 
-                # movement input
-                x_i, y_i = 0, 0
-                
-                # detect enemies
-                x_i, y_i = self.detect_enemies(entities, i)
-
-                # detect food
-                x, y = self.detect_food(corpses, entities, i)
-                if x or y:
-                    x_i, y_i = x, y
-
-                # submit input to the updater
-                if x_i==0 and y_i==0:
-                    x_i, y_i = self.idle_movement()
-                entities.parse_input({
-                    'i': i,
-                    'x': x_i,
-                    'y': y_i
-                }, camera, dt)
-
-    def detect_food(self, corpses, entities, index):
-        for i in range(len(corpses.pos)):
-            dist = dist_between(entities.pos[index], corpses.pos[i])
-            awareness = 500
-            if self.corpse_interact(entities, corpses, index, i, dist):
-                continue
-            if dist<=awareness:
-                angles = angles_between(entities.pos[index], corpses.pos[i])
-                return cos(angles['z']), sin(angles['z'])
-
-        return 0, 0
-
-    def detect_enemies(self, entities, index):
-        for i in range(len(entities.pos)):
-            if i != index:
-                dist = dist_between(entities.pos[i], entities.pos[index])
-                awareness = entities.interact_calculation(index, 'awareness', i, 'stealth')
-                aggression = entities.behaviours[index].aggression[i]
-                # determine the input to send
-                # TODO: sort input based on priority (aggression score) to see which one should be sent
-                if aggression>0 and dist<=awareness*aggression:
-                    # move towards the target
-                    angles = angles_between(entities.pos[index], entities.pos[i])
-                    return cos(angles['z']), sin(angles['z'])
-                elif aggression<0 and dist<=awareness*abs(aggression):
-                    angles = angles_between(entities.pos[index], entities.pos[i])
-                    return cos(angles['z']+pi), sin(angles['z']+pi)
-        return 0, 0
-
-    def idle_movement(self):
-        return randint(-1, 1), randint(-1, 1)
+        # the creatures due a decision work out where to go, a batch at a
+        # time for as long as the ai budget lasts, then every ai controlled
+        # creature steers the way it last decided in one call
+        self.scheduler.begin(entities, self.non_controllable)
+        self.decisions = []
+        ai = self.scheduler.batch(entities)
+        while len(ai):
+            entities.steering[ai] = self.decide_movement(entities, corpses, ai)
+            ai = self.scheduler.batch(entities)
+
+        # submit input to the updater
+        ai = np.flatnonzero(np.arange(len(entities.pos)) != self.non_controllable)
+        entities.steer(ai, entities.steering[ai, 0], entities.steering[ai, 1], camera, dt)
+
+    def decide_movement(self, entities, corpses, ai):
+        # screen space input of each of ai
+        # the worker pool, if there is one, picks the targets, finds the food
+        # in sight and steers, eating and wandering stay here since they
+        # change the world and draw from the rng
+        if self.workers is not None:
+            targets, sights, (steering, chase, angles) = self.workers.plan(entities, corpses, ai, FOOD_AWARENESS, FEED_RANGE)
+        else:
+            targets = entities.threats.select(entities, ai)
+            sights = corpses_in_sight(entities.pos[ai, :2], corpses.index(), FOOD_AWARENESS, FEED_RANGE)
+            steering, chase, angles = plan_steering(entities.pos, ai, targets, corpses.pos, sights[0])
+        self.decisions.append((ai, angles))
+
+        # the creatures that ate go for what is left in sight, or back after
+        # their target
+        eaters, food = self.eat(entities, corpses, ai, sights)
+        steering[eaters] = chase[eaters]
+        directions, found = food_steering(entities.pos, ai[eaters], corpses.pos, food)
+        steering[eaters[found]] = directions
+
+        # creatures with nothing to do wander
+        idle = np.flatnonzero((steering[:, 0] == 0) & (steering[:, 1] == 0))
+        steering[idle] = self.idle_movement(len(idle))
+        return steering
+
+    def eat(self, entities, corpses, ai, sights):
+        # creatures low on energy eat the corpses within reach, sights are
+        # the corpses_in_sight of ai
+        # returns the creatures that ate, as indices into ai, and the corpse
+        # each goes for next, -1 where there is none left in sight
+        food, in_reach = sights
+        hungry = entities.energy[ai]<entities.calculation_column('energy')[ai]/2
+        eaters = np.flatnonzero(hungry & in_reach)
+        food = np.full(len(eaters), -1, dtype=np.int64)
+        # corpses in sight are gone through nearest first, eating until one
+        # out of reach, or the creature is full, stops it. eating changes the
+        # energy so the few hungry creatures in reach are done one by one
+        for n, k in enumerate(eaters):
+            x, y = entities.pos[ai[k], :2]
+            for target in corpses.nearest(x, y, len(corpses), FOOD_AWARENESS):
+                if not corpses.nutrients[target]:
+                    # already eaten this step
+                    continue
+                in_range = (corpses.pos[target, 0]-x)**2+(corpses.pos[target, 1]-y)**2<=FEED_RANGE**2
+                if not in_range or not self.corpse_interact(entities, corpses, ai[k], target):
+                    food[n] = target
+                    break
+        return eaters, food
+
+    def idle_movement(self, num_creatures):
+        return np.random.randint(-1, 2, (num_creatures, 2))
 
     def ability_input(self, entities, combat_systemm):
-        for i in range(len(entities.abilities)):
-            if i!=self.non_controllable:
-                # give the ai controlled creature some 
-                # ability input
-                for j in range(len(entities.abilities)):
-                    if i==j: continue
-
-                    if 'ability_cd' not in entities.status_effects[i]['effects']:
-                        dist = dist_between(entities.pos[i], entities.pos[j])
-                        awareness = entities.interact_calculation(i, 'awareness', j, 'stealth')
-                        aggression = entities.behaviours[i].aggression[j]
-
-                        if aggression>0:
-                            if dist<=awareness*aggression/2:
-                                angles = angles_between(entities.pos[i], entities.pos[j])
-                                attack_abilities = list(filter(lambda ability: 'attack' in ALL_ABILITIES[ability]['type'], 
-                                                    entities.abilities[i]))
-                                queued_ability = choice(attack_abilities)
-                                ability = {
-                                    'i': i,
-                                    'ability': queued_ability,
-                                    'angle': angles['z']
-                                }
-                                combat_systemm.use_ability(ability)
+        # the creatures that made a decision this step attack the prey
+        # they picked then, far ones do not fight
+        for ai, angles in self.decisions:
+            for k in np.flatnonzero((entities.lod[ai] != LOD_FAR) & ~np.isnan(angles)):
+                self.attack_input(entities, combat_systemm, ai[k], angles[k])
+
+    def attack_input(self, entities, combat_systemm, i, angle):
+        # give the ai controlled creature some 
+        # ability input, angle is where its prey is, see attack_angles
+        if entities.has_status(i, 'ability_cd'):
+            return
+
+        attack_abilities = list(filter(lambda ability: 'attack' in ALL_ABILITIES[ability]['type'], 
+                            entities.abilities[i]))
+        queued_ability = choice(attack_abilities)
+        ability = {
+            'i': i,
+            'ability': queued_ability,
+            'angle': angle
+        }
+        combat_systemm.use_ability(ability)
     
     def accept_quests(self, entities, evo_system):
-        for i in range(len(entities.stats)):
-            if i != self.non_controllable:
-
-                quests = WorldEvent(entities, i).quests
-                abl_tr_quests = list(filter(lambda quest : quest['type'] in ['ability', 'trait'], quests))
-                alloc_quests = list(filter(lambda quest : quest['type'] == 'alloc', quests))
-                upg_quests = list(filter(lambda quest : quest['type'] == 'upgrade', quests))
-                if abl_tr_quests:
-                    evo_system.rec_quest(i, abl_tr_quests[0])
-                elif alloc_quests:
-                    evo_system.rec_quest(i, alloc_quests[0])
-                else:
-                    evo_system.rec_quest(i, upg_quests[0])
-
-    def corpse_interact(self, entities, corpses, index, target, dist):
-        if entities.energy[index]<entities.stat_calculation(index, preset='energy')/2:
-            if dist<=100:
-                entities.consume(index, target, corpses)
-                return True
+        # queues every ai controlled creature to pick a quest, quest_input
+        # works through the queue over the following steps
+        self.quest_queue.extend(int(entities.handle[i]) for i in range(len(entities.stats))
+                                if i != self.non_controllable)
+
+    def quest_input(self, entities, evo_system):
+        # accepts queued quests with what is left of the step's ai budget,
+        # at least one a step so that the queue always drains
+        accepted = 0
+        while self.quest_queue and (not accepted or self.scheduler.left()>0):
+            i = entities.slot(self.quest_queue.popleft())
+            if i is None:
+                continue
+            self.accept_quest(entities, evo_system, i)
+            accepted+=1
+
+    def accept_quest(self, entities, evo_system, i):
+        quests = WorldEvent(entities, i).quests
+        abl_tr_quests = list(filter(lambda quest : quest['type'] in ['ability', 'trait'], quests))
+        alloc_quests = list(filter(lambda quest : quest['type'] == 'alloc', quests))
+        upg_quests = list(filter(lambda quest : quest['type'] == 'upgrade', quests))
+        if abl_tr_quests:
+            evo_system.rec_quest(i, abl_tr_quests[0])
+        elif alloc_quests:
+            evo_system.rec_quest(i, alloc_quests[0])
+        else:
+            evo_system.rec_quest(i, upg_quests[0])
+
+    def close(self):
+        if self.workers is not None:
+            self.workers.close()
+
+    def corpse_interact(self, entities, corpses, index, target):
+        # target is already within FEED_RANGE
+        if entities.energy[index]<entities.entity_calculation(index, 'energy')/2:
+            entities.consume(index, target, corpses)
+            return True
 
         return False
\ No newline at end of file
@@ -0,0 +1,47 @@
+import numpy as np
+from time import perf_counter
+from src.combat.status_effects import COMBAT_MASK
+from src.util.settings import AI_BUDGET_MS, AI_BATCH_SIZE, AI_COMBAT_PRIORITY
+
+class AIScheduler:
+    # picks the ai entities that make a decision this step. an entity is
+    # due again LOD_AI_INTERVALS[tier] steps after its last decision, sooner
+    # if it is fighting, and the due entities are handed out most overdue
+    # first (nearest first on ties) in batches until the step's budget is
+    # spent. entities that miss out only get more overdue, so a large
+    # population makes decisions less often instead of slowing the step
+    # a budget of None hands out every due entity, which keeps seeded runs
+    # independent of how fast the machine is
+    def __init__(self, budget_ms=AI_BUDGET_MS, batch_size=AI_BATCH_SIZE):
+        self.budget = np.inf if budget_ms is None else budget_ms/1000
+        self.batch_size = batch_size
+        self.start = 0
+        self.queue = np.zeros(0, dtype=np.int64)
+        self.next = 0
+
+    def begin(self, entities, exclude):
+        # queues the due entities for this step, except exclude
+        self.start = perf_counter()
+        overdue = (entities.steps-entities.ai_step)/entities.ai_intervals()
+        fighting = (entities.status & COMBAT_MASK) != 0
+        overdue[fighting]*=AI_COMBAT_PRIORITY
+        overdue[exclude] = 0
+        due = np.flatnonzero(overdue>=1)
+        self.queue = due[np.lexsort((entities.lod[due], -overdue[due]))]
+        self.next = 0
+
+    def batch(self, entities):
+        # the next batch of the queue, empty once the queue or the budget is
+        # used up. the first batch of a step is always handed out
+        if self.next >= len(self.queue) or (self.next and self.spent() >= self.budget):
+            return self.queue[:0]
+        batch = self.queue[self.next:self.next+self.batch_size]
+        self.next+=len(batch)
+        entities.ai_step[batch] = entities.steps
+        return batch
+
+    def spent(self):
+        return perf_counter()-self.start
+
+    def left(self):
+        return self.budget-self.spent()
@@ -0,0 +1,193 @@
+import atexit
+import numpy as np
+from multiprocessing import Pool, resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from src.entities.corpse import corpses_in_sight, food_steering
+from src.util.spatial_hash import SpatialHash
+from src.util.settings import GRID_CELL_SIZE
+from src.entities.threat_lists import best_targets, candidate_pairs, rank_targets, chase_steering, attack_angles
+from src.models.behaviour import Behaviours
+
+# shared memory blocks a worker process has open, field: (name, block)
+attached = {}
+
+# the grid arrays shared with the workers, see SpatialHash.arrays
+GRID_ARRAYS = ['pos', 'cells', 'keys', 'order', 'columns']
+
+def shared_grid(arrays, prefix):
+    grid = SpatialHash(GRID_CELL_SIZE)
+    grid.load(*(arrays[prefix+field] for field in GRID_ARRAYS))
+    return grid
+
+def shared_array(field, spec):
+    # the worker's view of a shared array given its (block name, shape, dtype)
+    name, shape, dtype = spec
+    if field not in attached or attached[field][0] != name:
+        if field in attached:
+            attached[field][1].close()
+        attached[field] = (name, SharedMemory(name))
+    return np.ndarray(shape, dtype=dtype, buffer=attached[field][1].buf)
+
+def plan_steering(pos, rows, targets, corpse_pos, food):
+    # where each of rows goes, towards its food if it has any in sight and
+    # otherwise after its target, (0, 0) for neither. chase is the steering
+    # from the target alone, for the creatures that eat their food first
+    # targets as returned by best_targets and food by corpses_in_sight
+    # returns the steering, chase and attack_angles of rows
+    target, aggression, dist, reach = targets
+    chase = np.zeros((len(rows), 2))
+    directions, found = chase_steering(pos, rows, target, aggression)
+    chase[found] = directions
+    steering = chase.copy()
+    directions, found = food_steering(pos, rows, corpse_pos, food)
+    steering[found] = directions
+    return steering, chase, attack_angles(pos, rows, target, aggression, dist, reach)
+
+def plan_shard(specs, start, stop, sight, reach):
+    # runs in a worker, plans rows start:stop of the batch and writes the
+    # intents to the shared outputs, see AIWorkers.plan
+    arrays = {field: shared_array(field, spec) for field, spec in specs.items()}
+    pos = arrays['pos']
+    awareness = arrays['awareness']
+    rows = arrays['rows'][start:stop]
+
+    # rerank the dirty threat lists of the shard from their candidates
+    lists = arrays['lists'][start:stop].copy()
+    aggression = arrays['aggression'][start:stop].copy()
+    dirty = np.flatnonzero(arrays['dirty'][start:stop])
+    if len(dirty) and 'aggression_rows' in arrays:
+        # dense behaviours, the candidates are found here and the
+        # aggression rows of the dirty lists were shared in batch order
+        queries, others, dist_sq = candidate_pairs(shared_grid(arrays, 'grid_'), pos, awareness, rows[dirty])
+        offset = np.count_nonzero(arrays['dirty'][:start])
+        candidates = (dirty[queries], others, dist_sq, arrays['aggression_rows'][offset+queries, others])
+    elif len(dirty):
+        first, last = np.searchsorted(arrays['candidate_at'], [start, stop])
+        candidates = (arrays['candidate_at'][first:last]-start, arrays['candidates'][first:last],
+                      arrays['candidate_dist'][first:last], arrays['candidate_aggression'][first:last])
+    if len(dirty):
+        ranked, scores = rank_targets(awareness[rows], *candidates, lists.shape[1])
+        lists[dirty] = ranked[dirty]
+        aggression[dirty] = scores[dirty]
+    targets = best_targets(pos, awareness, arrays['stealth'], rows, lists, aggression)
+
+    grid = shared_grid(arrays, 'corpse_')
+    food, in_reach = corpses_in_sight(pos[rows, :2], grid, sight, reach)
+    steering, chase, angles = plan_steering(pos, rows, targets, grid.pos, food)
+
+    arrays['lists_out'][start:stop] = lists
+    arrays['target'][start:stop] = targets[0]
+    for j in range(3):
+        arrays['engagement'][start:stop, j] = targets[j+1]
+    arrays['food'][start:stop] = food
+    arrays['in_reach'][start:stop] = in_reach
+    arrays['steering'][start:stop, :2] = steering
+    arrays['steering'][start:stop, 2:] = chase
+    arrays['angle'][start:stop] = angles
+
+class AIWorkers:
+    # process pool that plans batches of ai decisions. what a decision
+    # reads is copied into shared memory blocks that the workers map, each
+    # worker plans a contiguous shard of the batch and writes its intents
+    # into shared output arrays, so only block names and shard bounds are
+    # pickled. the workers rerank the threat lists on the entity grid built
+    # here, pick targets, find the food in sight on the corpse grid and
+    # steer. sparse behaviours are not shared, with those the candidates of
+    # the lists and the aggression towards them are gathered here instead
+    def __init__(self, num_workers):
+        self.num_workers = num_workers
+        # the workers share the resource tracker that unlinks the blocks,
+        # rather than starting their own that would warn about them at exit
+        resource_tracker.ensure_running()
+        self.pool = Pool(num_workers)
+        self.blocks = {}    # field: SharedMemory
+        atexit.register(self.close)
+
+    def share(self, field, shape, dtype):
+        # shared array of the given shape for field, the block is replaced
+        # by one twice the size when it is too small
+        dtype = np.dtype(dtype)
+        size = max(1, int(np.prod(shape))*dtype.itemsize)
+        block = self.blocks.get(field)
+        if block is None or block.size < size:
+            if block is not None:
+                block.close()
+                block.unlink()
+            block = SharedMemory(create=True, size=2*size)
+            self.blocks[field] = block
+        return np.ndarray(shape, dtype=dtype, buffer=block.buf), (block.name, shape, dtype.str)
+
+    def plan(self, entities, corpses, ai, sight, reach):
+        # ThreatLists.select, corpses_in_sight and plan_steering of ai,
+        # worked out by the pool
+        threats = entities.threats
+        threats.prepare(entities)
+        dirty = threats.dirty[ai]
+        lists = threats.targets[ai]
+        # the aggression towards the listed entities of the lists kept
+        clean = np.flatnonzero(~dirty)
+        aggression = np.zeros(lists.shape)
+        aggression[clean] = entities.behaviours.pair_scores('aggression', ai[clean, None],
+                                                            np.where(lists[clean] >= 0, lists[clean], 0))
+        n = len(ai)
+        inputs = {
+            'pos': entities.pos,
+            'awareness': entities.calculation_column('awareness'),
+            'stealth': entities.calculation_column('stealth'),
+            'rows': ai,
+            'dirty': dirty,
+            'lists': lists,
+            'aggression': aggression,
+        }
+        if isinstance(entities.behaviours, Behaviours):
+            inputs['aggression_rows'] = entities.behaviours.rows('aggression', ai[dirty])
+            for field, array in entities.index().arrays().items():
+                inputs['grid_'+field] = array
+        else:
+            queries, others, dist_sq, candidate_aggression = threats.candidates(entities, ai[dirty])
+            # the row of the batch each candidate is for, ascending
+            inputs['candidate_at'] = np.flatnonzero(dirty)[queries]
+            inputs['candidates'] = others
+            inputs['candidate_dist'] = dist_sq
+            inputs['candidate_aggression'] = candidate_aggression
+        for field, array in corpses.index().arrays().items():
+            inputs['corpse_'+field] = array
+        outputs = {
+            'lists_out': ((n, threats.k), np.int64),
+            'target': ((n,), np.int64),
+            'engagement': ((n, 3), np.float64),     # aggression, distance and reach
+            'food': ((n,), np.int64),
+            'in_reach': ((n,), np.bool_),
+            'steering': ((n, 4), np.float64),       # steering and chase
+            'angle': ((n,), np.float64),
+        }
+        specs = {}
+        for field, array in inputs.items():
+            shared, specs[field] = self.share(field, array.shape, array.dtype)
+            shared[:] = array
+        results = {}
+        for field, (shape, dtype) in outputs.items():
+            results[field], specs[field] = self.share(field, shape, dtype)
+
+        bounds = np.linspace(0, n, self.num_workers+1).astype(np.int64)
+        self.pool.starmap(plan_shard, [(specs, start, stop, sight, reach)
+                                       for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start])
+
+        threats.targets[ai] = results['lists_out']
+        threats.dirty[ai] = False
+        engagement = results['engagement'].copy()
+        steering = results['steering'].copy()
+        return ((results['target'].copy(), engagement[:, 0], engagement[:, 1], engagement[:, 2]),
+                (results['food'].copy(), results['in_reach'].copy()),
+                (steering[:, :2], steering[:, 2:], results['angle'].copy()))
+
+    def close(self):
+        if self.pool is None:
+            return
+        self.pool.terminate()
+        self.pool.join()
+        self.pool = None
+        for block in self.blocks.values():
+            block.close()
+            block.unlink()
+        self.blocks = {}
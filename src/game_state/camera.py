@@ -4,27 +4,58 @@ import numpy as np
 class Camera():
     def __init__(self, x, y, z):
         self.pos = np.array([x, y, z])
+        # pos before the last update and the pos things are drawn from,
+        # which is between the two when rendering is interpolated
+        self.prev_pos = self.pos
+        self.view_pos = self.pos
 
         self.scale = -6 # micrometer scale
 
         self.transform = np.array([[1, 0, 0], [0, 1, 0], [0, -1, 1]]).transpose()
         self.inverse = np.linalg.inv(self.transform)
         self.collapse_z = np.array([[1, 0], [0, 1], [0, 0]]).transpose()
+        # collapse_z and transform pre-multiplied into one (2, 3) projection
+        self.projection = self.collapse_z.dot(self.transform).astype(np.float64)
+        self.center = np.array([WIDTH//2, HEIGHT//2], dtype=np.float64)
 
     def transform_to_screen(self, pos):
         # returns the full transformation with the shift to the center of the screen
-        return self.dir_transform(np.array(pos)-self.pos)+np.array([WIDTH//2, HEIGHT//2])
+        return self.projection.dot(np.asarray(pos[0:3], dtype=np.float64)-self.view_pos)+self.center
+
+    def project(self, points, out=None):
+        # batched transform_to_screen, (k, 3) world points to (k, 2) screen
+        # points, written into out if a buffer is given
+        points = np.asarray(points, dtype=np.float64)
+        if out is None:
+            out = np.empty((len(points), 2))
+        if len(points) == 0:
+            return out
+        np.matmul(points[:, :3], self.projection.T, out=out)
+        out+=self.center-self.projection.dot(self.view_pos)
+        return out
 
     def dir_transform(self, pos):
         # returns the transformation but without a shift to the center of the screen
-        return self.collapse_z.dot(self.transform.dot(np.array(pos)))
+        return self.projection.dot(np.asarray(pos, dtype=np.float64))
 
     def screen_to_world(self, x, y):
         return self.collapse_z.dot(self.inverse.dot(np.array([x, y, 0])))
 
+    def screen_to_world_batch(self, x, y):
+        # batched screen_to_world, arrays of x and y to a (k, 2) array
+        screen = np.zeros((len(x), 3))
+        screen[:, 0] = x
+        screen[:, 1] = y
+        return screen.dot(self.collapse_z.dot(self.inverse).T)
+
     def follow_entity(self, entities, following):
         self.update_pos(np.array(entities.pos[following][0:3]))
         self.scale = entities.scale[following]
     
     def update_pos(self, pos):
-        self.pos = pos
\ No newline at end of file
+        self.prev_pos = self.pos
+        self.pos = pos
+        self.view_pos = pos
+
+    def interpolate(self, alpha):
+        self.view_pos = self.prev_pos+(self.pos-self.prev_pos)*alpha
\ No newline at end of file
@@ -0,0 +1,49 @@
+from time import perf_counter
+from src.game_state.player_controller import IdleController, ScriptedController
+from src.game_state.world import build_world, step_world, generation_due, new_generation
+
+# the scripted player walks a square
+PLAYER_SCRIPT = [(1, 0)]*50+[(0, 1)]*50+[(-1, 0)]*50+[(0, -1)]*50
+
+def run_headless(ticks=0, generations=0, seed=0, num_creatures=0, player_mode='idle', trace_path=None, ai_workers=0):
+    # steps the world as fast as possible with nothing drawn, until either
+    # limit is hit (0 means no limit) or the player dies
+    # the profiler's last frames are written to trace_path if given
+    player = 0
+    # no ai budget, so that a seed always plays out the same
+    game_data = build_world(player, num_creatures, seed, ai_budget_ms=None, ai_workers=ai_workers)
+    if player_mode == 'scripted':
+        controller = ScriptedController(player, PLAYER_SCRIPT)
+    else:
+        controller = IdleController(player)
+    profiler = game_data['profiler']
+
+    tick = 0
+    generation = 0
+    player_died = False
+    start = perf_counter()
+    while (not ticks or tick < ticks) and (not generations or generation < generations):
+        profiler.begin_frame()
+        step_world(game_data, controller)
+        tick+=1
+        if game_data['entities'].kill(player, game_data['corpses']):
+            player_died = True
+            break
+        if generation_due(game_data):
+            generation+=1
+            with profiler.span('generation'):
+                new_generation(game_data, generation)
+        profiler.end_frame()
+    elapsed = perf_counter()-start
+    game_data['ai'].close()
+    if trace_path:
+        profiler.export_chrome_trace(trace_path)
+
+    return {
+        'ticks': tick,
+        'generations': generation,
+        'creatures': len(game_data['entities'].creature),
+        'player_died': player_died,
+        'seconds': elapsed,
+        'ticks_per_second': tick/elapsed if elapsed else 0,
+    }
@@ -1,8 +1,9 @@
 from math import sqrt, sin, cos, pi
 from random import randint, choice
 import pygame as pg
-from src.util.settings import NEW_GEN_TIME, FPS, CBODY_TEXTURE_KEY, SUN, ORBIT_RADIUS, WIDTH, HEIGHT, TITLE_FONT_SIZE
+from src.util.settings import PROFILER_TRACE_PATH, FPS, CBODY_TEXTURE_KEY, SUN, ORBIT_RADIUS, WIDTH, HEIGHT, TITLE_FONT_SIZE
 from src.game_state.camera import Camera
+from src.game_state.world import step_world, generation_due, new_generation
 from src.combat.world_event import WorldEvent
 
 def start_menu(screen, game_data):
@@ -83,11 +84,11 @@ def start_menu(screen, game_data):
         font.render(screen=screen, text='hello, universe', 
                     x=WIDTH//2, y=50, 
                     colour=(r, g, b), 
-                    size=TITLE_FONT_SIZE, style='center')
+                    size=TITLE_FONT_SIZE, style='center', tint=True)
         font.render(screen=screen, text='press anywhere to continue', 
                     x=WIDTH//2, y=HEIGHT-50,
                     colour=(r, g, b),
-                    size=TITLE_FONT_SIZE, style='center')
+                    size=TITLE_FONT_SIZE, style='center', tint=True)
         update_solar_system()
 
         ui.draw_mouse(screen)
@@ -99,12 +100,12 @@ def game_menu(screen, game_data):
     entities = game_data['entities']
     corpses = game_data['corpses']
     evo_system = game_data['evo_system']
-    combat_system = game_data['combat_system']
-    environment = game_data['environment']
 
     controller = game_data['controller']
-    ai_controller = game_data['ai']
     camera = game_data['camera']
+    sim_clock = game_data['sim_clock']
+    profiler = game_data['profiler']
+    render_queue = game_data['render_queue']
     player = game_data['player']
     ui = game_data['ui']
 
@@ -112,82 +113,80 @@ def game_menu(screen, game_data):
     font = game_data['font']
 
     generation = 0
-    generation_time = pg.time.get_ticks()
+    game_data['generation_time'] = sim_clock.time
 
     while True:
-        events = pg.event.get()
-        for event in events:
-            if event.type == pg.QUIT:
-                pg.quit()
-                exit()
-            if event.type == pg.KEYDOWN:
-                if event.key == pg.K_ESCAPE:
-                    return
-                if event.key == pg.K_SPACE:
-                    evo_system.in_species_reproduce()
-                # if event.key == pg.K_TAB:
-                #     ui.toggle_quests_menu()
-                #     ui.update_quests(WorldEvent(entities.get_entity_data(player)))
-                #     ui.input(events, entities, corpses)
-                if event.key == pg.K_DELETE:
-                    entities.health[player] = -100
-                    
-        ui.input(events, entities, corpses, evo_system)
+        profiler.begin_frame()
+        with profiler.span('events'):
+            events = pg.event.get()
+            for event in events:
+                if event.type == pg.QUIT:
+                    pg.quit()
+                    exit()
+                if event.type == pg.KEYDOWN:
+                    if event.key == pg.K_ESCAPE:
+                        return
+                    if event.key == pg.K_SPACE:
+                        evo_system.in_species_reproduce()
+                    # if event.key == pg.K_TAB:
+                    #     ui.toggle_quests_menu()
+                    #     ui.update_quests(WorldEvent(entities.get_entity_data(player)))
+                    #     ui.input(events, entities, corpses)
+                    if event.key == pg.K_DELETE:
+                        entities.health[player] = -100
+                    if event.key == pg.K_F3:
+                        profiler.toggle_overlay()
+                    if event.key == pg.K_F4:
+                        profiler.export_chrome_trace(PROFILER_TRACE_PATH)
+                        
+            ui.input(events, entities, corpses, evo_system)
         # refresh screen
         screen.fill('black')
-        dt = clock.tick()/15
-
-        # player input
-        entities.parse_input(controller.movement_input(), camera, dt)
-        combat_system.use_ability(controller.ability_input(entities))
-
-        # ai controller
-        ai_controller.movement_input(entities, corpses, camera, dt)
-        ai_controller.ability_input(entities, combat_system)
-        
-        # update loop
-        entities.update(camera, dt)
-        camera.follow_entity(entities, player)
-        corpses.update()
-        combat_system.update(entities, camera)
-
-        # drawing
-        entities.render(screen, camera)
-        corpses.render(screen, camera)
-        if controller.queued_ability!=-1:
-            ui.ability_indicator(screen, entities, controller, camera)
-        ui.display(screen, entities, generation)
-        # ui.arrow_to_corpse(screen, entities, player, corpses, camera)
-
-        # death
-        if entities.kill(player, corpses):
-            game_over(screen, font, clock, entities, camera, ui)
-            return
-
-        # new generation
-        if pg.time.get_ticks() - generation_time > NEW_GEN_TIME:
-            # update the generation
-            generation_time = pg.time.get_ticks()
-            generation+=1
-
-            # call the evo systems to operate on entities
-            # evo_system.new_generation(entities)
-
-            # tell the ai to accept the new quests for the ais
-            ai_controller.accept_quests(entities, evo_system)
-
-            # allow the player to accept new quests
-            ui.toggle_quests_menu()
-            ui.update_quests(WorldEvent(entities, player))
-            ui.input(events, entities, corpses, evo_system)
-
-            # update the environment based on creature actions
-            environment.new_generation(generation)
+        frame_ms = clock.tick()
+
+        # fixed steps of the simulation for the real time that passed
+        for step in range(sim_clock.accumulate(frame_ms)):
+            with profiler.span('step'):
+                step_world(game_data, controller)
+
+            # death
+            if entities.kill(player, corpses):
+                game_over(screen, font, clock, entities, camera, render_queue, ui, generation)
+                return
+
+            # new generation
+            if generation_due(game_data):
+                with profiler.span('generation'):
+                    # update the generation
+                    generation+=1
+
+                    # evolution, ai quests and the environment
+                    new_generation(game_data, generation)
+
+                    # allow the player to accept new quests
+                    ui.toggle_quests_menu()
+                    ui.update_quests(WorldEvent(entities, player))
+                    ui.input(events, entities, corpses, evo_system)
+
+        # drawing, between the last two steps
+        with profiler.span('render'):
+            camera.interpolate(sim_clock.alpha)
+            entities.render(render_queue, camera, sim_clock.alpha)
+            corpses.render(render_queue)
+            render_queue.flush(screen, camera)
+        with profiler.span('ui'):
+            if controller.queued_ability!=-1:
+                ui.ability_indicator(screen, entities, controller, camera)
+            ui.display(screen, entities, generation)
+            # ui.arrow_to_corpse(screen, entities, player, corpses, camera)
+        profiler.render(screen, font)
     
-        pg.display.update()
-        pg.display.set_caption(f'{clock.get_fps()}, {dt}')
+        with profiler.span('present'):
+            pg.display.update()
+        pg.display.set_caption(f'{clock.get_fps()}, {sim_clock.time}')
+        profiler.end_frame()
 
-def game_over(screen, font, clock, entities, camera, ui):
+def game_over(screen, font, clock, entities, camera, render_queue, ui, generation):
 
     black_screen = pg.Surface((WIDTH, HEIGHT))
     black_screen.fill('black')
@@ -205,8 +204,9 @@ def game_over(screen, font, clock, entities, camera, ui):
         black_screen.set_alpha(screen_alpha)
 
         screen.fill('black')
-        entities.render(screen, camera)
-        ui.display(screen, entities)
+        entities.render(render_queue, camera)
+        render_queue.flush(screen, camera)
+        ui.display(screen, entities, generation)
         
         screen.blit(black_screen, (0, 0))
         font.render(screen=screen, text='you died', 
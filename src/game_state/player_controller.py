@@ -59,4 +59,40 @@ class PlayerController():
             'i': self.index,
             'ability': -1,
             'angle': 0,
-        }
\ No newline at end of file
+        }
+
+class IdleController():
+    # stands in for the player when there is no keyboard or mouse
+    def __init__(self, index):
+        self.index = index
+        self.queued_ability = -1
+
+    def movement_input(self):
+        return {
+            'i': self.index,
+            'x': 0,
+            'y': 0
+        }
+
+    def ability_input(self, entity):
+        return {
+            'i': self.index,
+            'ability': -1,
+            'angle': 0,
+        }
+
+class ScriptedController(IdleController):
+    # replays a list of (x, y) movement inputs, one per tick, looping
+    def __init__(self, index, script):
+        super().__init__(index)
+        self.script = script
+        self.tick = 0
+
+    def movement_input(self):
+        x, y = self.script[self.tick%len(self.script)]
+        self.tick+=1
+        return {
+            'i': self.index,
+            'x': x,
+            'y': y
+        }
@@ -0,0 +1,141 @@
+import pygame as pg
+import numpy as np
+from src.util.settings import WIDTH, HEIGHT
+
+CIRCLE = 0
+LINE = 1
+
+class RenderQueue:
+    # collects every primitive of a frame, then culls, depth sorts and
+    # draws them in one flush
+    def __init__(self):
+        self.palette = []
+        self.colour_index = {}
+        # pre-rendered circles keyed by (colour, radius, width)
+        self.sprites = {}
+        self.buffer = np.empty((0, 2))
+        # added to every point queued, used to interpolate moving models
+        self.offset = np.zeros(3)
+        self.counts = {
+            'circles': 0,
+            'lines': 0,
+            'culled': 0,
+            'drawn': 0,
+        }
+        self.clear()
+
+    def clear(self):
+        self.circle_chunks = []
+        self.line_chunks = []
+
+    def colour(self, colour):
+        if colour not in self.colour_index:
+            self.colour_index[colour] = len(self.palette)
+            self.palette.append(pg.Color(colour))
+        return self.colour_index[colour]
+
+    #############################
+    # queueing                  #
+    #############################
+    def circles(self, centers, radius, colour, width=0):
+        # centers is (k, 3) in world space, radius is a scalar or (k,)
+        centers = np.asarray(centers, dtype=np.float64).reshape(-1, 3)
+        chunk = np.empty((len(centers), 6))
+        chunk[:, :3] = centers+self.offset
+        chunk[:, 3] = radius
+        chunk[:, 4] = self.colour(colour)
+        chunk[:, 5] = width
+        self.circle_chunks.append(chunk)
+
+    def lines(self, starts, ends, colour, width=1):
+        # starts and ends are (k, 3) in world space
+        starts = np.asarray(starts, dtype=np.float64).reshape(-1, 3)
+        chunk = np.empty((len(starts), 8))
+        chunk[:, :3] = starts+self.offset
+        chunk[:, 3:6] = np.asarray(ends, dtype=np.float64).reshape(-1, 3)+self.offset
+        chunk[:, 6] = self.colour(colour)
+        chunk[:, 7] = width
+        self.line_chunks.append(chunk)
+
+    #############################
+    # drawing                   #
+    #############################
+    def flush(self, screen, camera):
+        circles = np.concatenate(self.circle_chunks) if self.circle_chunks else np.empty((0, 6))
+        lines = np.concatenate(self.line_chunks) if self.line_chunks else np.empty((0, 8))
+        self.clear()
+        num_circles = len(circles)
+        num_lines = len(lines)
+
+        # every point of the frame projected in one call
+        num_points = num_circles+2*num_lines
+        if len(self.buffer) < num_points:
+            self.buffer = np.empty((2*num_points, 2))
+        screen_pos = self.buffer[:num_points]
+        camera.project(np.concatenate([circles[:, :3], lines[:, :3], lines[:, 3:6]]), out=screen_pos)
+        circle_pos = screen_pos[:num_circles]
+        line_starts = screen_pos[num_circles:num_circles+num_lines]
+        line_ends = screen_pos[num_circles+num_lines:]
+
+        # cull against the screen rectangle
+        radius = circles[:, 3]
+        circle_visible = ((circle_pos[:, 0]+radius>=0) & (circle_pos[:, 0]-radius<=WIDTH) &
+                          (circle_pos[:, 1]+radius>=0) & (circle_pos[:, 1]-radius<=HEIGHT))
+        line_visible = ((np.maximum(line_starts[:, 0], line_ends[:, 0])>=0) &
+                        (np.minimum(line_starts[:, 0], line_ends[:, 0])<=WIDTH) &
+                        (np.maximum(line_starts[:, 1], line_ends[:, 1])>=0) &
+                        (np.minimum(line_starts[:, 1], line_ends[:, 1])<=HEIGHT))
+        circle_index = np.flatnonzero(circle_visible)
+        line_index = np.flatnonzero(line_visible)
+
+        # depth sort, back to front along world y then bottom to top along z
+        # lexsort is stable so primitives at the same depth keep their order
+        depth_y = np.concatenate([circles[circle_index, 1],
+                                  (lines[line_index, 1]+lines[line_index, 4])/2])
+        depth_z = np.concatenate([circles[circle_index, 2],
+                                  (lines[line_index, 2]+lines[line_index, 5])/2])
+        kinds = np.concatenate([np.full(len(circle_index), CIRCLE), np.full(len(line_index), LINE)])
+        indices = np.concatenate([circle_index, line_index])
+        order = np.lexsort((depth_z, depth_y))
+
+        self.submit(screen, kinds[order].tolist(), indices[order].tolist(),
+                    circles, circle_pos, lines, line_starts, line_ends)
+
+        self.counts = {
+            'circles': num_circles,
+            'lines': num_lines,
+            'culled': num_circles+num_lines-len(order),
+            'drawn': len(order),
+        }
+
+    def submit(self, screen, kinds, indices, circles, circle_pos, lines, line_starts, line_ends):
+        # runs of circles are drawn with one Surface.blits of cached sprites,
+        # lines break the run so the depth order is kept
+        circle_pos = circle_pos.tolist()
+        circles = circles[:, 3:6].tolist()
+        line_starts = line_starts.tolist()
+        line_ends = line_ends.tolist()
+        lines = lines[:, 6:8].tolist()
+        blits = []
+        for kind, i in zip(kinds, indices):
+            if kind == CIRCLE:
+                radius, colour, width = circles[i]
+                sprite = self.circle_sprite(int(colour), round(radius), int(width))
+                x, y = circle_pos[i]
+                blits.append((sprite, (x-sprite.get_width()//2, y-sprite.get_height()//2)))
+                continue
+            if blits:
+                screen.blits(blits, doreturn=False)
+                blits = []
+            colour, width = lines[i]
+            pg.draw.line(screen, self.palette[int(colour)], line_starts[i], line_ends[i], int(width))
+        if blits:
+            screen.blits(blits, doreturn=False)
+
+    def circle_sprite(self, colour, radius, width):
+        key = (colour, radius, width)
+        if key not in self.sprites:
+            sprite = pg.Surface((2*radius+1, 2*radius+1), pg.SRCALPHA)
+            pg.draw.circle(sprite, self.palette[colour], (radius, radius), radius, width)
+            self.sprites[key] = sprite
+        return self.sprites[key]
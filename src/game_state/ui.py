@@ -5,6 +5,9 @@ from src.combat.abilities import ALL_ABILITIES, BASE_AOE_RADIUS
 
 QUEST_LINGER_TIME = 1000
 
+# widgets of the retained hud, in drawing order
+HUD_WIDGETS = ['hp', 'energy', 'stats', 'traits_and_abilities', 'statuses', 'generation']
+
 class UserInterface:
     def __init__(self, player, font, ui_sprites):
         self.font = font
@@ -25,6 +28,17 @@ class UserInterface:
             'capsule': ui_sprites['hud_frames']['capsule'],
             'nutrients': ui_sprites['hud_frames']['nutrients'],
         })
+
+        # the hud is composited into a cached layer, black is transparent
+        # the frame never changes and is kept separately to erase widgets with
+        self.hud_static = pg.Surface((WIDTH, HEIGHT))
+        self.display_hud_frame(self.hud_static)
+        self.hud_layer = self.hud_static.copy()
+        self.hud_layer.set_colorkey((0, 0, 0))
+        # what each widget showed when it was last drawn and where
+        self.widget_keys = {widget: None for widget in HUD_WIDGETS}
+        self.widget_rects = {widget: pg.Rect(0, 0, 0, 0) for widget in HUD_WIDGETS}
+        self.tinted_trait_icons = {}
     
     def colorkey_all(self, ui_sprites):
         for sprite_type in ui_sprites:
@@ -52,24 +66,12 @@ class UserInterface:
 
     def display(self, screen, entities, generation):
 
-        self.display_hud_frame(screen)
-
-        # hp and energy bars
-        self.display_hp(screen, entities)
-        
-        self.display_energy(screen, entities)
-
-        # stats
-        self.display_stats(screen, entities)
-
-        # traits and abilities
-        self.display_traits_and_abilities(screen, entities)
-
-        # status effects
-        self.display_statuses(screen, entities)
+        # frame, hp and energy bars, stats, traits and abilities,
+        # status effects and the generation
+        self.update_hud(entities, generation)
+        screen.blit(self.hud_layer, (0, 0))
 
         self.draw_mouse(screen)
-        self.display_generation(screen, generation)
 
         # quest
         if self.quest_ui['display']:
@@ -90,15 +92,83 @@ class UserInterface:
         if interact['type'] == 'consume':
             entities.consume(self.player, interact['index'], corpses)
     
+    ############################# 
+    # retained hud              #
+    ############################# 
+    def hud_keys(self, entities, generation):
+        # everything each widget shows, a widget is redrawn when its key changes
+        traits = entities.traits[self.player]
+        return {
+            'hp': self.gauge_level(entities.health[self.player], entities.stats[self.player]['hp']),
+            'energy': self.gauge_level(entities.energy[self.player], 
+                                       entities.entity_calculation(self.player, 'energy')),
+            'stats': tuple(entities.stats[self.player][stat] for stat in ['itl', 'pwr', 'def', 'mbl', 'stl']),
+            'traits_and_abilities': (tuple(entities.abilities[self.player]), tuple(traits.traits),
+                                     traits.new_trait.get('reward')),
+            'statuses': int(entities.status[self.player]),
+            'generation': generation,
+        }
+
+    def gauge_level(self, value, total):
+        # rows of the gauge that are emptied
+        return int((1-value/total)*GAUGE_UI['radius']*2)
+
+    def draw_widget(self, widget, layer, entities, generation):
+        # draws the widget on the layer and returns the rect it covered
+        match widget:
+            case 'hp':
+                return self.display_hp(layer, entities)
+            case 'energy':
+                return self.display_energy(layer, entities)
+            case 'stats':
+                return self.display_stats(layer, entities)
+            case 'traits_and_abilities':
+                return self.display_traits_and_abilities(layer, entities)
+            case 'statuses':
+                return self.display_statuses(layer, entities)
+            case 'generation':
+                return self.display_generation(layer, generation)
+
+    def update_hud(self, entities, generation):
+        keys = self.hud_keys(entities, generation)
+        dirty = {widget for widget in HUD_WIDGETS if keys[widget] != self.widget_keys[widget]}
+        if not dirty:
+            return
+
+        # erasing a widget also erases the parts of the widgets it overlaps
+        erased = []
+        pending = list(dirty)
+        while pending:
+            rect = self.widget_rects[pending.pop()]
+            erased.append(rect)
+            for widget in HUD_WIDGETS:
+                if widget not in dirty and rect.colliderect(self.widget_rects[widget]):
+                    dirty.add(widget)
+                    pending.append(widget)
+        for rect in erased:
+            self.hud_layer.blit(self.hud_static, rect, rect)
+
+        # redraw in order, widgets drawn later that the new drawing
+        # overlaps are drawn again so they stay on top
+        drawn = []
+        for widget in HUD_WIDGETS:
+            if widget not in dirty and not any(rect.colliderect(self.widget_rects[widget]) for rect in drawn):
+                continue
+            rect = self.draw_widget(widget, self.hud_layer, entities, generation)
+            self.widget_rects[widget] = rect
+            self.widget_keys[widget] = keys[widget]
+            drawn.append(rect)
+
     def display_generation(self, screen, generation):
         frame = self.hud_frames['gen_frame']
-        screen.blit(frame,
-                    (WIDTH//2-frame.get_width()//2, HEADER-frame.get_height()//2))
+        rect = screen.blit(frame,
+                           (WIDTH//2-frame.get_width()//2, HEADER-frame.get_height()//2))
         self.font.render(screen=screen,
                          text=f'gen {generation}',
                          x=WIDTH//2, y=HEADER,
                          colour=(255, 255, 255),
                          size=TITLE_FONT_SIZE, style='center')
+        return rect
         ...
 
     def display_hud_frame(self, screen):
@@ -131,9 +201,9 @@ class UserInterface:
                         (GAUGE_UI['radius'], GAUGE_UI['radius']), 
                         GAUGE_UI['radius'])
         pg.draw.rect(health_bar, 'black', (0, 0, 2*GAUGE_UI['radius'], health_ratio*GAUGE_UI['radius']*2))
-        screen.blit(health_bar, (hp_frame.get_width()/2-GAUGE_UI['radius'], 
-                                HEIGHT-hp_frame.get_height()/2-GAUGE_UI['radius']))
-        screen.blit(hp_frame, (0, HEIGHT-hp_frame.get_height()))
+        rect = screen.blit(health_bar, (hp_frame.get_width()/2-GAUGE_UI['radius'], 
+                                        HEIGHT-hp_frame.get_height()/2-GAUGE_UI['radius']))
+        return rect.union(screen.blit(hp_frame, (0, HEIGHT-hp_frame.get_height())))
 
     def display_energy(self, screen, entities):
         # energy bar, similar in style to the health
@@ -148,9 +218,9 @@ class UserInterface:
         # total energy based on power and defense and number of body parts
 
         pg.draw.rect(energy_bar, 'black', (0, 0, 2*GAUGE_UI['radius'], energy_ratio*GAUGE_UI['radius']*2))
-        screen.blit(energy_bar, (WIDTH-energy_frame.get_width()/2-GAUGE_UI['radius'], 
-                                HEIGHT-energy_frame.get_height()/2-GAUGE_UI['radius']))
-        screen.blit(energy_frame, (WIDTH-energy_frame.get_width(), HEIGHT-energy_frame.get_height()))
+        rect = screen.blit(energy_bar, (WIDTH-energy_frame.get_width()/2-GAUGE_UI['radius'], 
+                                        HEIGHT-energy_frame.get_height()/2-GAUGE_UI['radius']))
+        return rect.union(screen.blit(energy_frame, (WIDTH-energy_frame.get_width(), HEIGHT-energy_frame.get_height())))
 
     def display_stats(self, screen, entities):
         # stat bars on the right
@@ -165,15 +235,16 @@ class UserInterface:
         stats_frame = self.hud_frames['stats_frame']
         left_edge_pad = self.hud_frames['hp_frame'].get_width()
         bar_edge_pad = left_edge_pad+STAT_BAR_UI['bar_pad']
+        rect = pg.Rect(bar_edge_pad+STAT_BAR_UI['left_pad'], HEIGHT-STAT_BAR_UI['bottom_pad'], 0, 0)
         for i in range(len(stats)):
             stat_rect = pg.Rect(bar_edge_pad+STAT_BAR_UI['left_pad']+i*STAT_BAR_UI['width'],
                                 HEIGHT-stats[i]-STAT_BAR_UI['bottom_pad'], STAT_BAR_UI['width'], stats[i])
-            pg.draw.rect(screen, STAT_BAR_UI['colours'][i], stat_rect)
+            rect.union_ip(pg.draw.rect(screen, STAT_BAR_UI['colours'][i], stat_rect))
             icon = self.stat_icons[i]
-            screen.blit(icon, (bar_edge_pad+STAT_BAR_UI['left_pad']+(i+0.5)*STAT_BAR_UI['width']-icon.get_width()/2, 
-                                             HEIGHT-STAT_BAR_UI['bottom_pad']+STAT_BAR_UI['frame_pad']))
+            rect.union_ip(screen.blit(icon, (bar_edge_pad+STAT_BAR_UI['left_pad']+(i+0.5)*STAT_BAR_UI['width']-icon.get_width()/2, 
+                                             HEIGHT-STAT_BAR_UI['bottom_pad']+STAT_BAR_UI['frame_pad'])))
         
-        screen.blit(stats_frame, (left_edge_pad+STAT_BAR_UI['left_pad'], HEIGHT-STAT_BAR_UI['bottom_pad']-stats_frame.get_height()+STAT_BAR_UI['frame_pad']))
+        return rect.union(screen.blit(stats_frame, (left_edge_pad+STAT_BAR_UI['left_pad'], HEIGHT-STAT_BAR_UI['bottom_pad']-stats_frame.get_height()+STAT_BAR_UI['frame_pad'])))
 
     def ability_slots(self, screen, entities):
         abilities = entities.abilities[self.player]
@@ -181,10 +252,12 @@ class UserInterface:
         right_pad = self.hud_frames['energy_frame'].get_width()
         left_edge_pad = WIDTH-right_pad-frame.get_width()-ATS_UI['right_pad']
         icon_edge_pad = left_edge_pad+ATS_UI['frame_pad']
+        rect = pg.Rect(icon_edge_pad, HEIGHT, 0, 0)
         for i in range(len(abilities)):
             icon = self.ability_icons[abilities[i]]
-            screen.blit(icon, (icon_edge_pad+i*(ATS_UI['icon_size']+ATS_UI['frame_width']),
-                                HEIGHT-frame.get_height()//2+ATS_UI['frame_width']//2))
+            rect.union_ip(screen.blit(icon, (icon_edge_pad+i*(ATS_UI['icon_size']+ATS_UI['frame_width']),
+                                             HEIGHT-frame.get_height()//2+ATS_UI['frame_width']//2)))
+        return rect
 
     def trait_slots(self, screen, entities):
         traits = entities.traits[self.player].traits
@@ -193,26 +266,35 @@ class UserInterface:
         right_pad = self.hud_frames['energy_frame'].get_width()
         left_edge_pad = WIDTH-right_pad-frame.get_width()-ATS_UI['right_pad']
         icon_edge_pad = left_edge_pad+ATS_UI['frame_pad']
+        rect = pg.Rect(icon_edge_pad, HEIGHT, 0, 0)
         for i in range(len(traits)):
             icon = self.trait_icons[traits[i]]
-            screen.blit(icon, (icon_edge_pad+i*(ATS_UI['icon_size']+ATS_UI['frame_width']),
-                                HEIGHT-frame.get_height()+ATS_UI['frame_pad']))
+            rect.union_ip(screen.blit(icon, (icon_edge_pad+i*(ATS_UI['icon_size']+ATS_UI['frame_width']),
+                                             HEIGHT-frame.get_height()+ATS_UI['frame_pad'])))
         
         # display new traits
         if new_trait:
-            icon = self.trait_icons[new_trait['reward']].copy()
+            rect.union_ip(screen.blit(self.tinted_trait_icon(new_trait['reward']), 
+                                      (icon_edge_pad+len(traits)*ATS_UI['icon_size'],
+                                       HEIGHT-frame.get_height()+ATS_UI['frame_pad'])))
+        return rect
+
+    def tinted_trait_icon(self, trait):
+        if trait not in self.tinted_trait_icons:
+            icon = self.trait_icons[trait].copy()
             icon.fill((255, 0, 0, 100), special_flags=pg.BLEND_RGBA_ADD)
-            screen.blit(icon, (icon_edge_pad+len(traits)*ATS_UI['icon_size'],
-                                HEIGHT-frame.get_height()+ATS_UI['frame_pad']))
+            self.tinted_trait_icons[trait] = icon
+        return self.tinted_trait_icons[trait]
 
     def display_traits_and_abilities(self, screen, entities):
         frame = self.hud_frames['ability_and_trait_frame']
         right_pad = self.hud_frames['energy_frame'].get_width()
         left_edge_pad = WIDTH-right_pad-frame.get_width()-ATS_UI['right_pad']
-        screen.blit(frame, (left_edge_pad, 
-                    HEIGHT-frame.get_height()))
-        self.ability_slots(screen, entities)
-        self.trait_slots(screen, entities)
+        rect = screen.blit(frame, (left_edge_pad, 
+                           HEIGHT-frame.get_height()))
+        rect.union_ip(self.ability_slots(screen, entities))
+        rect.union_ip(self.trait_slots(screen, entities))
+        return rect
 
     def ability_indicator(self, screen, entities, controller, camera):
         ability_num = controller.queued_ability
@@ -246,12 +328,14 @@ class UserInterface:
     
     def display_statuses(self, screen, entities):
         frame = self.hud_frames['ability_and_trait_frame']
-        status_effects = entities.status_effects[self.player]
+        status_effects = entities.status_effects(self.player)
         right_pad = WIDTH-self.hud_frames['energy_frame'].get_width()-2*ATS_UI['right_pad']
         bottom_pad = HEIGHT-frame.get_height()-ATS_UI['reg_pad']-ATS_UI['icon_size']//2
-        for i in range(len(status_effects['effects'])):
-            icon = self.status_icons[status_effects['effects'][i]]
-            screen.blit(icon, (-(i+1)*(icon.get_width()+ATS_UI['reg_pad'])+right_pad, bottom_pad))
+        rect = pg.Rect(right_pad, bottom_pad, 0, 0)
+        for i in range(len(status_effects)):
+            icon = self.status_icons[status_effects[i]]
+            rect.union_ip(screen.blit(icon, (-(i+1)*(icon.get_width()+ATS_UI['reg_pad'])+right_pad, bottom_pad)))
+        return rect
 
     def arrow_to_corpse(self, screen, entities, player, corpses, camera):
         for i in range(len(corpses.pos)):
@@ -469,10 +553,9 @@ class Interaction_UI:
 
     def detection(self, pos, corpses):
         self.in_range = -1
-        for i, corpse_pos in enumerate(corpses.pos):
-            dr_sq = (corpse_pos[0]-pos[0])**2 + (corpse_pos[1]-pos[1])**2
-            if dr_sq <= 50**2:
-                self.in_range = i
+        nearest = corpses.nearest(pos[0], pos[1], 1, 50)
+        if len(nearest):
+            self.in_range = int(nearest[0])
     
     def input(self, pg_event):
         for event in pg_event:
@@ -0,0 +1,135 @@
+import random
+import numpy as np
+from copy import deepcopy
+from src.game_state.ai_controller import AIController
+from src.game_state.camera import Camera
+from src.entities.entities import Entities
+from src.entities.corpse import Corpses
+from src.entities.evo_system import EvoSystem
+from src.entities.combat_system import CombatSystem
+from src.combat.abilities import BASIC_ABILITIES
+from src.environment.environment import Environment
+from src.util.sim_clock import SimClock
+from src.util.profiler import Profiler
+from src.util.settings import BASE_STATS, SPAWN_RADIUS, SPARSE_BEHAVIOUR_CREATURES, AI_BUDGET_MS, AI_WORKERS, NEW_GEN_TIME
+
+# the simulation side of the game, shared by the window and the headless runner
+
+PLAYER_DATA = {
+    'pos': [0, 0, 20, 0],
+    'spd': 5,
+    'acc': 0.5,
+    'body_parts': 10,
+    'size': 5,
+    'scale': -6,
+    'max_parts': 10,
+    'num_legs': 0,
+    'leg_length': 100,
+    'aggression': [],
+    'herd': [],
+    'abilities': BASIC_ABILITIES,
+    'traits': []
+}
+
+def build_world(player, num_creatures=0, seed=None, sparse_behaviours=None, ai_budget_ms=AI_BUDGET_MS, ai_workers=AI_WORKERS):
+    if seed is not None:
+        random.seed(seed)
+        np.random.seed(seed)
+    if sparse_behaviours is None:
+        sparse_behaviours = num_creatures >= SPARSE_BEHAVIOUR_CREATURES
+
+    sim_clock = SimClock()
+    camera = Camera(0, 0, 0)
+    entities = Entities(sparse_behaviours)
+    entities.add_new_entity(deepcopy(PLAYER_DATA), deepcopy(BASE_STATS))
+    spawn_creatures(entities, num_creatures)
+
+    return {
+        'entities': entities,
+        'sim_clock': sim_clock,
+        'generation_time': sim_clock.time,
+        'profiler': Profiler(),
+        'camera': camera,
+        'player': player,
+        'ai': AIController(player, ai_budget_ms, ai_workers),
+        'corpses': Corpses(),
+        'evo_system': EvoSystem(entities),
+        'combat_system': CombatSystem(entities, camera, sim_clock),
+        'environment': Environment({
+            'region_data': {},
+        }),
+    }
+
+def spawn_creatures(entities, num_creatures):
+    for i in range(num_creatures):
+        num_existing = len(entities.creature)
+        entities.add_new_entity({
+            'pos': [random.uniform(-SPAWN_RADIUS, SPAWN_RADIUS),
+                    random.uniform(-SPAWN_RADIUS, SPAWN_RADIUS), 20, 0],
+            'spd': 5,
+            'acc': 0.5,
+            'body_parts': random.randint(3, 10),
+            'size': 5,
+            'scale': -6,
+            'max_parts': 10,
+            'num_legs': random.randint(0, 3),
+            'leg_length': 100,
+            'aggression': [random.uniform(-1, 1) for j in range(num_existing)],
+            'herd': [random.uniform(0, 1) for j in range(num_existing)],
+            'abilities': BASIC_ABILITIES.copy(),
+            'traits': []
+        }, deepcopy(BASE_STATS))
+
+#############################
+# simulation step           #
+#############################
+def step_world(game_data, controller):
+    # advances the world by one fixed step of the sim clock
+    sim_clock = game_data['sim_clock']
+    dt = sim_clock.dt
+    entities = game_data['entities']
+    corpses = game_data['corpses']
+    combat_system = game_data['combat_system']
+    ai_controller = game_data['ai']
+    camera = game_data['camera']
+    profiler = game_data['profiler']
+
+    # player input
+    with profiler.span('input'):
+        entities.parse_input(controller.movement_input(), camera, dt)
+        combat_system.use_ability(controller.ability_input(entities))
+
+    # ai controller
+    with profiler.span('ai'):
+        ai_controller.movement_input(entities, corpses, camera, dt)
+        ai_controller.ability_input(entities, combat_system)
+        ai_controller.quest_input(entities, game_data['evo_system'])
+
+    # update loop
+    with profiler.span('update'):
+        entities.update(camera, dt, sim_clock.time)
+        camera.follow_entity(entities, game_data['player'])
+        corpses.update()
+    with profiler.span('combat'):
+        combat_system.update(entities, camera)
+    sim_clock.step()
+
+def generation_due(game_data):
+    # true on the step that ends a generation, the window and the headless
+    # runner both ask here so that a seed starts its generations on the same
+    # steps in either
+    sim_clock = game_data['sim_clock']
+    if sim_clock.time - game_data['generation_time'] > NEW_GEN_TIME:
+        game_data['generation_time'] = sim_clock.time
+        return True
+    return False
+
+def new_generation(game_data, generation):
+    # call the evo systems to operate on entities
+    # evo_system.new_generation(entities)
+
+    # tell the ai to accept the new quests for the ais
+    game_data['ai'].accept_quests(game_data['entities'], game_data['evo_system'])
+
+    # update the environment based on creature actions
+    game_data['environment'].new_generation(generation)
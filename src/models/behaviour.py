@@ -1,35 +1,204 @@
-from random import uniform, randint
-
-class Behaviour:
-    def __init__(self, behaviour_data):
-        # float from -1 to 1. 
-        # 1. very aggressive, always fights
-        # -1. not aggressive, always flees
-        # 0 neutral
-        # a number is kept for each entity in the game
-        self.aggression = behaviour_data['aggression']
-
-        # float from 0 to 1
-        # 0. very lonely, does not try to herd
-        # 1. very social, herds always
-        # a number is kept for each entity in the game
-        self.herding = behaviour_data['herding']
-
-    def update_aggression(self, i, new_score):
-        if i<len(self.aggression):
-            self.aggression[i:i+1] = [new_score]
-        else:
-            self.aggression.append(new_score)
-    
-    def update_herd_behaviour(self, i, new_score):
-        if i<len(self.herding):
-            self.herding[i:i+1] = [new_score]
-        else:
-            self.herding.append(new_score)
+import numpy as np
+
+# scores every entity keeps for every other entity, indexed [entity, other]
+# aggression: float from -1 to 1.
+#   1. very aggressive, always fights
+#   -1. not aggressive, always flees
+#   0 neutral
+# herding: float from 0 to 1
+#   0. very lonely, does not try to herd
+#   1. very social, herds always
+BEHAVIOURS = ['aggression', 'herding']
+# the range each score is kept in, the radius queries of detect_enemies and
+# ThreatLists rely on aggression staying within [-1, 1]
+BEHAVIOUR_RANGES = {'aggression': (-1, 1), 'herding': (0, 1)}
+
+INITIAL_CAPACITY = 64
+
+def score_items(scores):
+    # (other, score) pairs of a list of scores or an {other: score} dict
+    if isinstance(scores, dict):
+        return scores.items()
+    return ((j, score) for j, score in enumerate(scores) if score)
+
+class Behaviours:
+    # dense N x N float32 matrix per behaviour, grown by doubling like
+    # ColumnStore and shrunk by swapping the last row and column into a
+    # removed entity
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        self.count = 0
+        self.capacity = capacity
+        self.data = {name: np.zeros((capacity, capacity), dtype=np.float32) for name in BEHAVIOURS}
+
+    def __len__(self):
+        return self.count
+
+    def matrix(self, name):
+        return self.data[name][:self.count, :self.count]
+
+    def add(self, aggression, herding):
+        # scores of the new entity for the existing ones, anything past
+        # them is ignored and the others start neutral towards it
+        if self.count == self.capacity:
+            self.grow()
+        i = self.count
+        for name, scores in zip(BEHAVIOURS, [aggression, herding]):
+            matrix = self.data[name]
+            matrix[i, :i+1] = 0
+            matrix[:i+1, i] = 0
+            if isinstance(scores, dict):
+                for j, score in scores.items():
+                    if j < i:
+                        matrix[i, j] = score
+            else:
+                scores = scores[:i]
+                matrix[i, :len(scores)] = scores
+        self.count+=1
+        return i
+
+    def grow(self):
+        self.capacity*=2
+        for name, matrix in self.data.items():
+            new_matrix = np.zeros((self.capacity, self.capacity), dtype=np.float32)
+            new_matrix[:self.count, :self.count] = matrix[:self.count, :self.count]
+            self.data[name] = new_matrix
+
+    def remove(self, i):
+        # mirrors the swap-remove in Entities.remove_entity
+        last = self.count-1
+        if i != last:
+            for matrix in self.data.values():
+                matrix[i, :self.count] = matrix[last, :self.count]
+                matrix[:self.count, i] = matrix[:self.count, last]
+        self.count-=1
+
+    def score(self, name, i, j):
+        return self.data[name][i, j]
+
+    def scores(self, name, i, others):
+        # entity i's scores for each of others, as an array
+        return self.data[name][i, others]
+
+    def pair_scores(self, name, rows, others):
+        # scores of rows[n] for others[n], broadcast like numpy indexing
+        return self.data[name][rows, others]
+
+    def rows(self, name, rows):
+        # every score of each of rows, as a (len(rows), count) array
+        return self.data[name][rows, :self.count]
+
+    def set_score(self, name, i, j, score):
+        self.data[name][i, j] = score
+
+    def row(self, name, i):
+        # a copy of every score of entity i, for passing on to offspring
+        return self.data[name][i, :self.count].copy()
+
+    def to_sparse(self):
+        # the set scores as SparseBehaviours, for a population grown too
+        # large for the matrices
+        sparse = SparseBehaviours()
+        sparse.count = self.count
+        for name in BEHAVIOURS:
+            matrix = self.matrix(name)
+            rows, others = np.nonzero(matrix)
+            scores = matrix[rows, others].astype(np.float64)
+            starts = np.searchsorted(rows, np.arange(self.count+1))
+            sparse.rows[name] = [dict(zip(others[start:stop].tolist(), scores[start:stop].tolist()))
+                                 for start, stop in zip(starts[:-1], starts[1:])]
+            sparse.columns[name] = [set() for i in range(self.count)]
+            for i, j in zip(rows.tolist(), others.tolist()):
+                sparse.columns[name][j].add(i)
+        return sparse
+
+    def shift(self):
+        # every score drifts by up to 1% in a random direction
+        n = self.count
+        for name, matrix in self.data.items():
+            matrix[:n, :n]+=np.random.uniform(0, 1, (n, n))/100*np.random.randint(-1, 2, (n, n))
+            np.clip(matrix[:n, :n], *BEHAVIOUR_RANGES[name], out=matrix[:n, :n])
+
+class SparseBehaviours:
+    # same interface as Behaviours for populations too large for N x N
+    # matrices. only scores that were set are kept, in a dict per row, with
+    # the rows holding a score for each column indexed to keep removal
+    # proportional to the entries touched. unset scores are neutral (0)
+    # and stay neutral through shift
+    def __init__(self):
+        self.count = 0
+        self.rows = {name: [] for name in BEHAVIOURS}     # row i: {j: score}
+        self.columns = {name: [] for name in BEHAVIOURS}  # column j: rows with a score for j
+
+    def __len__(self):
+        return self.count
+
+    def add(self, aggression, herding):
+        i = self.count
+        for name, scores in zip(BEHAVIOURS, [aggression, herding]):
+            self.rows[name].append({})
+            self.columns[name].append(set())
+            for j, score in score_items(scores):
+                if j < i:
+                    self.set_score(name, i, j, score)
+        self.count+=1
+        return i
+
+    def remove(self, i):
+        last = self.count-1
+        for name in BEHAVIOURS:
+            rows = self.rows[name]
+            columns = self.columns[name]
+            # drop row i and column i
+            for j in rows[i]:
+                if j != i:
+                    columns[j].discard(i)
+            for k in columns[i]:
+                if k != i:
+                    del rows[k][i]
+            rows[i] = {}
+            columns[i] = set()
+            if i != last:
+                # move the last row and then the last column into i
+                row = rows[last]
+                for j in row:
+                    columns[j].discard(last)
+                    columns[j].add(i)
+                rows[i] = row
+                rows[last] = {}
+                column = columns[last]
+                for k in column:
+                    rows[k][i] = rows[k].pop(last)
+                columns[i] = column
+            rows.pop()
+            columns.pop()
+        self.count-=1
+
+    def score(self, name, i, j):
+        return self.rows[name][i].get(j, 0.0)
+
+    def scores(self, name, i, others):
+        row = self.rows[name][i]
+        return np.array([row.get(j, 0.0) for j in others], dtype=np.float64)
+
+    def pair_scores(self, name, rows, others):
+        rows, others = np.broadcast_arrays(rows, others)
+        scores = [self.rows[name][i].get(j, 0.0) for i, j in zip(rows.flat, others.flat)]
+        return np.array(scores, dtype=np.float64).reshape(rows.shape)
+
+    def set_score(self, name, i, j, score):
+        self.rows[name][i][j] = score
+        self.columns[name][j].add(i)
+
+    def row(self, name, i):
+        return self.rows[name][i].copy()
 
     def shift(self):
-        for i in range(len(self.aggression)):
-            aggro_score = self.aggression[i]+uniform(0, 1)/100*randint(-1, 1)
-            herd_score = self.herding[i]+uniform(0, 1)/100*randint(-1, 1)
-            self.update_aggression(i, aggro_score)
-            self.update_herd_behaviour(i, herd_score)
+        # the stored scores drift like those of Behaviours.shift
+        for name, rows in self.rows.items():
+            low, high = BEHAVIOUR_RANGES[name]
+            for row in rows:
+                if not row:
+                    continue
+                drift = np.random.uniform(0, 1, len(row))/100*np.random.randint(-1, 2, len(row))
+                for j, change in zip(row, drift):
+                    row[j] = min(max(row[j]+change, low), high)
@@ -1,15 +1,18 @@
 import pygame as pg
-from math import cos, sin, ceil, pi, log10
+import numpy as np
+from math import ceil, log10
 from src.models.legs import Legs
-from src.util.physics import collide, dist_between, angles_between
-from src.util.settings import HEIGHT, MODEL_COLORS, OUT_OF_BOUNDS, WIDTH, MAX_SIZE, MIN_SIZE
+from src.util.settings import MODEL_COLORS, MAX_SIZE, MIN_SIZE
 
 class Creature:
     def __init__(self, num_parts, pos, size, max_parts, num_pair_legs, leg_length):
         self.num_parts = num_parts
         self.head = pos
         self.z_pos = pos[2]
-        self.skeleton = []
+        self.skeleton = np.zeros((0, 4))
+        # the Skeletons this creature's skeleton is stored in, if any
+        self.rig = None
+        self.rig_slot = -1
         self.size = size
         self.max_parts = max_parts
         self.legs = Legs(num_pair_legs=num_pair_legs, 
@@ -18,12 +21,22 @@ class Creature:
         self.give_legs()
     
     def build_skeleton(self, pos, a=0, upright=False):
-        self.skeleton = []
-        for i in range(self.num_parts):
-            self.skeleton.append([pos[0]-(i+1)*2*self.size, pos[1], pos[2], a])
+        self.skeleton = np.zeros((self.num_parts, 4))
+        # laid out in a line trailing behind the head
+        trail = (np.arange(self.num_parts)+1)*2*self.size
+        self.skeleton[:, 0] = pos[0]-trail*np.cos(a)
+        self.skeleton[:, 1] = pos[1]-trail*np.sin(a)
+        self.skeleton[:, 2] = pos[2]
+        self.skeleton[:, 3] = a
+        self.sync_rig()
         
         if upright:
             self.upright()
+
+    def sync_rig(self):
+        # push the skeleton and body data into the shared skeleton array
+        if self.rig is not None:
+            self.rig.attach(self)
     
     def give_wings(self):
         self.legs.transform_leg(self.legs.free_leg(), 'wing', 1)
@@ -79,6 +92,12 @@ class Creature:
 
         self.upright()
 
+    def rebuild_model(self):
+        # fresh skeleton and feet at the head, for a creature whose model
+        # was left where it was while it was out of view
+        self.build_skeleton([self.head[0], self.head[1], self.z_pos], self.head[3], upright=True)
+        self.legs.place_feet(self.skeleton)
+
     def change_body(self, change_in_size):
         self.size+=change_in_size
         if self.size<MIN_SIZE:
@@ -94,6 +113,7 @@ class Creature:
                 return round(log10(self.max_parts*MAX_SIZE))
             
             self.build_skeleton(new_pos, upright=True)
+        self.sync_rig()
         return 0
 
     def increase_body_potential(self):
@@ -116,57 +136,22 @@ class Creature:
 
         self.upright()
 
-    def render(self, screen, camera):
+    def render(self, render_queue, joints=None):
 
         # if is_moving:
         #     t = pg.time.get_ticks()
         #     self.wiggle(t)
 
-        x, y = camera.transform_to_screen(self.head[0:3])
-        if x>WIDTH+OUT_OF_BOUNDS or x<-OUT_OF_BOUNDS or y>HEIGHT+OUT_OF_BOUNDS or y<-OUT_OF_BOUNDS:
-            return False 
-        pg.draw.circle(screen, MODEL_COLORS['head'], (x, y), self.size)
-        for i in range(self.num_parts):
-            x, y = camera.transform_to_screen(self.skeleton[i][0:3])
-            pg.draw.circle(screen, MODEL_COLORS['skeleton'], (x, y), self.size)
-            pg.draw.circle(screen, MODEL_COLORS['hurt_box'], (x, y), self.size, 1)
+        # culling and depth order are left to the render queue
+        render_queue.circles(self.head[0:3], self.size, MODEL_COLORS['head'])
+        segments = self.skeleton[:, 0:3]
+        render_queue.circles(segments, self.size, MODEL_COLORS['skeleton'])
+        render_queue.circles(segments, self.size, MODEL_COLORS['hurt_box'], 1)
 
         # if is_moving:
         #     self.dewiggle(t)
 
-        self.legs.draw(screen, self.skeleton, camera)
-        return True
-
-    def move(self, pos, effects, is_moving):
-        self.head = pos
-        if self.skeleton:
-            dist = dist_between(self.skeleton[0], self.head)
-            angle = angles_between(self.skeleton[0], self.head)['z']
-            self.skeleton[0][0]+=(dist-2*self.size)*cos(angle)
-            self.skeleton[0][1]+=(dist-2*self.size)*sin(angle)
-            self.skeleton[0][3] = angle
-
-            for i in range(1, len(self.skeleton)):
-                dist = dist_between(self.skeleton[i], self.skeleton[i-1])
-                angle = angles_between(self.skeleton[i], self.skeleton[i-1])['z']
-                self.skeleton[i][0]+=(dist-2*self.size)*cos(angle)
-                self.skeleton[i][1]+=(dist-2*self.size)*sin(angle)
-                self.skeleton[i][3] = angle
-
-            self.legs.move_feet(self.skeleton, effects)
-
-        if is_moving:
-            self.wiggle(pg.time.get_ticks())
-
-    def wiggle(self, t):
-        wiggle_mag = 0.25
-        if self.skeleton:
-            start = self.legs.get_torso_start()
-            period = (len(self.skeleton) - start)
-            for i in range(start, len(self.skeleton)):
-                perp_offset = wiggle_mag*sin(pi/period*i)*cos(t/100)
-                self.skeleton[i][0]+=perp_offset*cos(self.skeleton[i][3]+pi/2)
-                self.skeleton[i][1]+=perp_offset*sin(self.skeleton[i][3]+pi/2)
+        self.legs.draw(render_queue, self.skeleton, joints)
 
     def upright(self):
         torso_segment = self.legs.get_torso_start()
@@ -175,17 +160,4 @@ class Creature:
         for i in range(torso_segment, -1, -1):
             self.skeleton[i][2]=self.z_pos+self.size*2*(torso_segment-i)
         self.head[2]=self.z_pos+self.size*2*(torso_segment+1)
-
-    def collide(self, hurt_boxes):
-
-        hit_box = [self.head[0], self.head[1], self.head[2], self.size]
-        for hurt_box in hurt_boxes:
-            if collide(hit_box, hurt_box):
-                return True
-
-        for i in range(len(self.skeleton)):
-            segment = self.skeleton[i]
-            hit_box = [segment[0], segment[1], segment[2], self.size]
-            for hurt_box in hurt_boxes:
-                if collide(hit_box, hurt_box):
-                    return True
+        self.sync_rig()
@@ -1,6 +1,6 @@
-import pygame as pg
 from math import sqrt, pi, sin, cos, exp
 from src.util.settings import MODEL_COLORS, TRAIT_AND_BODY_LEVELS
+from src.combat.status_effects import STATUS_BIT, STATUS_INDEX, AIRBORNE_MASK, ANIMATED_EFFECTS
 import numpy as np
 
 class Legs:
@@ -35,54 +35,50 @@ class Legs:
                                 body_seg_pos[1]+self.leg_length*sin(-self.step_bend), 
                                 0])
 
+    def place_feet(self, skeleton):
+        # put the feet back under the segments they are attached to, keeping
+        # the leg types
+        self.feet_pos = []
+        self.step_pos = []
+        for index in self.attached_segments:
+            self.build_legs(skeleton[index])
+
     ############################# 
     # draw                      #
     ############################# 
-    def draw(self, screen, skeleton, camera):
+    def draw(self, render_queue, skeleton, joints=None):
+        # joints are the knee/elbow positions of the legs listed by
+        # joint_requests, solved here if they were not batched by the caller
+        if joints is None:
+            feet, bodies, bends = self.joint_requests(skeleton)
+            joints = leg_joint_positions(feet, bodies, self.leg_length, bends)
+        if self.num_pair_legs == 0:
+            return
+        feet = np.array([foot[0:3] for foot in self.feet_pos[:2*self.num_pair_legs]], dtype=np.float64)
+        # each foot is attached to the body segment of its pair
+        bodies = skeleton[np.repeat(self.attached_segments[:self.num_pair_legs], 2), 0:3]
+        jointed = np.repeat([not (leg_type['type'] == 'leg' and leg_type['level'] != TRAIT_AND_BODY_LEVELS['max'])
+                             for leg_type in self.leg_types[:self.num_pair_legs]], 2)
+
+        render_queue.circles(feet, self.feet_size, MODEL_COLORS['foot'])
+        render_queue.lines(feet[~jointed], bodies[~jointed], MODEL_COLORS['leg'])
+        render_queue.lines(feet[jointed], joints, MODEL_COLORS['leg'])
+        render_queue.lines(joints, bodies[jointed], MODEL_COLORS['leg'])
+
+    def joint_requests(self, skeleton):
+        # foot, body segment and bend direction of every leg that bends at a
+        # joint, in the order that draw uses them
+        feet = []
+        bodies = []
+        bends = []
         for i in range(self.num_pair_legs):
-            screen_pos = []
             if self.leg_types[i]['type'] == 'leg' and self.leg_types[i]['level'] != TRAIT_AND_BODY_LEVELS['max']:
-                screen_pos.append(camera.transform_to_screen(self.feet_pos[2*i][0:3]))
-                screen_pos.append(camera.transform_to_screen(skeleton[self.attached_segments[i]][0:3]))
-                pg.draw.circle(screen, MODEL_COLORS['foot'], screen_pos[0], self.feet_size)
-                pg.draw.line(screen, MODEL_COLORS['leg'], screen_pos[0],
-                                            screen_pos[1])
-                
-                screen_pos = []
-                screen_pos.append(camera.transform_to_screen(self.feet_pos[2*i+1][0:3]))
-                screen_pos.append(camera.transform_to_screen(skeleton[self.attached_segments[i]][0:3]))
-                pg.draw.circle(screen, MODEL_COLORS['foot'], screen_pos[0], self.feet_size)
-                pg.draw.line(screen, MODEL_COLORS['leg'], screen_pos[0],
-                                            screen_pos[1])
                 continue
-            # foot pos
-            screen_pos.append(camera.transform_to_screen(self.feet_pos[2*i][0:3]))
-            # joint pos
-            joint_x, joint_y, joint_z = self.calculate_leg_joint_pos(self.feet_pos[2*i], skeleton[self.attached_segments[i]], -1)
-            screen_pos.append(camera.transform_to_screen([joint_x, joint_y, joint_z]))
-            # body pos
-            screen_pos.append(camera.transform_to_screen(skeleton[self.attached_segments[i]][0:3]))
-            # draw the feet
-            pg.draw.circle(screen, MODEL_COLORS['foot'], screen_pos[0], self.feet_size)
-            pg.draw.line(screen, MODEL_COLORS['leg'], screen_pos[0],
-                                          screen_pos[1])
-            pg.draw.line(screen, MODEL_COLORS['leg'], screen_pos[1],
-                                          screen_pos[2])
-
-            # other leg of pair
-            screen_pos = []
-            # foot pos
-            screen_pos.append(camera.transform_to_screen(self.feet_pos[2*i+1][0:3]))
-            # joint pos
-            joint_x, joint_y, joint_z = self.calculate_leg_joint_pos(self.feet_pos[2*i+1], skeleton[self.attached_segments[i]], 1)
-            screen_pos.append(camera.transform_to_screen([joint_x, joint_y, joint_z]))
-            # body pos
-            screen_pos.append(camera.transform_to_screen(skeleton[self.attached_segments[i]][0:3]))
-            pg.draw.circle(screen, MODEL_COLORS['foot'], screen_pos[0], self.feet_size)
-            pg.draw.line(screen, MODEL_COLORS['leg'], screen_pos[0],
-                                          screen_pos[1])
-            pg.draw.line(screen, MODEL_COLORS['leg'], screen_pos[1],
-                                          screen_pos[2])
+            body_seg_pos = skeleton[self.attached_segments[i]]
+            feet.extend([self.feet_pos[2*i][0:3], self.feet_pos[2*i+1][0:3]])
+            bodies.extend([body_seg_pos, body_seg_pos])
+            bends.extend([-1, 1])
+        return feet, bodies, bends
     
     ############################# 
     # movement                  #
@@ -116,12 +112,12 @@ class Legs:
         self.feet_pos[2*i] = self.step_pos[2*i]
         self.feet_pos[2*i+1] = self.step_pos[2*i+1]
 
-    def move_fins(self, skeleton, i):
+    def move_fins(self, skeleton, i, now):
         # fins are lower level legs that don't yet act as legs
         index = self.attached_segments[i]
         x, y, z = skeleton[index][0], skeleton[index][1], skeleton[index][2]
         angle = skeleton[index][3]
-        offset_angle = pi/4+pi/4*(1+cos(pg.time.get_ticks()/500 + i))
+        offset_angle = pi/4+pi/4*(1+cos(now/500 + i))
         self.step_pos[2*i] = [x+self.leg_length/4*cos(offset_angle+angle),
                               y+self.leg_length/4*sin(offset_angle+angle),
                               z]
@@ -132,10 +128,11 @@ class Legs:
         self.feet_pos[2*i] = self.step_pos[2*i]
         self.feet_pos[2*i+1] = self.step_pos[2*i+1]
 
-    def move_feet(self, skeleton, effects):
+    def move_feet(self, skeleton, effects, now):
+        # now is the simulation time in ms
         # update the step pos: where the feet should be 
         # it took a step
-        abilities = effects['effects']
+        status = effects['status']
 
         for i in range(self.num_pair_legs):
             index = self.attached_segments[i]
@@ -156,11 +153,11 @@ class Legs:
                 self.move_arms(skeleton, i)
             elif self.leg_types[i]['type'] == 'wing': 
                 self.move_wings(skeleton, i)
-            elif 'in_air' in abilities or 'underwater' in abilities:
-                self.feet_pos[2*i] = skeleton[self.attached_segments[i]][:3]
-                self.feet_pos[2*i+1] = skeleton[self.attached_segments[i]][:3]
+            elif status & AIRBORNE_MASK:
+                self.feet_pos[2*i] = skeleton[self.attached_segments[i]][:3].copy()
+                self.feet_pos[2*i+1] = skeleton[self.attached_segments[i]][:3].copy()
             elif self.leg_types[i]['level'] != TRAIT_AND_BODY_LEVELS['max']:
-                self.move_fins(skeleton, i)
+                self.move_fins(skeleton, i, now)
             else:
                 if self.dist_foot_to_body(self.feet_pos[2*i], skeleton[self.attached_segments[i]]) >= self.leg_length:
                     # if the distance from the foot to the body segment
@@ -170,10 +167,11 @@ class Legs:
                     # same for the other foot
                     self.feet_pos[2*i+1] = self.step_pos[2*i+1]
 
-        for i in range(len(abilities)):
-            self.ability_animate(skeleton, abilities[i], effects['time'][i])
+        for ability in ANIMATED_EFFECTS:
+            if status & STATUS_BIT[ability]:
+                self.ability_animate(skeleton, ability, effects['time'][STATUS_INDEX[ability]], now)
 
-    def ability_animate(self, skeleton, ability, time):
+    def ability_animate(self, skeleton, ability, time, now):
         if ability == 'strike':
             # use the time to model the trajectory of the swing
             leg_length = self.leg_length*3/4
@@ -182,7 +180,7 @@ class Legs:
             angle = skeleton[index][3]
             elev_angle = pi/6
 
-            t = 3 / (1 + exp(-(pg.time.get_ticks()-time-100)/10))
+            t = 3 / (1 + exp(-(now-time-100)/10))
 
             para = leg_length/2*(1-cos(t))
             perp = sqrt(leg_length**2-para**2)*sin(t)
@@ -207,7 +205,7 @@ class Legs:
             x, y, z = skeleton[skeleton_index][0], skeleton[skeleton_index][1], skeleton[skeleton_index][2]
             angle = skeleton[skeleton_index][3]
 
-            t = (pg.time.get_ticks()-time)/100
+            t = (now-time)/100
             perp = self.leg_length*2/3
             up = sqrt(self.leg_length**2-perp)*sin(t)
 
@@ -230,7 +228,7 @@ class Legs:
             x, y, z = skeleton[skeleton_index][0], skeleton[skeleton_index][1], skeleton[skeleton_index][2]
             angle = skeleton[skeleton_index][3]
 
-            t = (pg.time.get_ticks()-time)/100
+            t = (now-time)/100
             para = -self.leg_length*3/4
             up = sqrt(self.leg_length**2-para)*sin(t)
 
@@ -298,50 +296,33 @@ class Legs:
                     (foot_pos[1]-body_seg_pos[1])**2 + 
                     (foot_pos[2]-body_seg_pos[2])**2)
 
-    def calculate_leg_joint_pos(self, foot_pos, body_seg_pos, neg):
-        # xy_dist = sqrt((foot_pos[0]-body_seg_pos[0])**2+(foot_pos[1]-body_seg_pos[1])**2)
-        
-        # distance from foot to body segment
-        dist = self.dist_foot_to_body(foot_pos, body_seg_pos)
-        # vector pointing from body to foot
-        body_to_foot_dir = [
-            foot_pos[0]-body_seg_pos[0],
-            foot_pos[1]-body_seg_pos[1],
-            foot_pos[2]-body_seg_pos[2]
-        ]
-        # vector that the body is point in on the xy plane
-        facing_dir = [
-            cos(body_seg_pos[3]),
-            sin(body_seg_pos[3]),
-            0
-        ]
-        # take the cross product of these two vectors and normalize
-        # to find the direction that the joint should be perpendicular to the 
-        # body-foot disp and the facing direction
-        bend_vec = [
-            body_to_foot_dir[1]*facing_dir[2]-body_to_foot_dir[2]*facing_dir[1],
-            body_to_foot_dir[2]*facing_dir[0]-body_to_foot_dir[0]*facing_dir[2],
-            body_to_foot_dir[0]*facing_dir[1]-body_to_foot_dir[1]*facing_dir[0],
-        ]
-        bend_vec = np.cross(np.array(body_to_foot_dir), np.array(facing_dir))
-        norm = np.linalg.norm(bend_vec)
-        bend_dir = bend_vec
-        if norm !=0:
-            bend_dir = neg*bend_vec/norm
-            
-        # find the tail of the joint vector
-        bend_root = [
-            body_seg_pos[0]+(foot_pos[0]-body_seg_pos[0])/2,
-            body_seg_pos[1]+(foot_pos[1]-body_seg_pos[1])/2,
-            body_seg_pos[2]+(foot_pos[2]-body_seg_pos[2])/2,
-        ]
-        # each segment of the leg is half of the length of the entire leg
-        # use pythagorean to determine the magnitude of the joint vector
-        joint_vec_size = (self.leg_length/2)**2-(dist/2)**2
-        # absolute value to account for floating point arithmetic
-        joint_vec_size = sqrt(abs(joint_vec_size))
-        # now calculate the position of the joint
-        joint_pos = np.array(bend_root) + joint_vec_size*bend_dir
-
-        return joint_pos
-        
+def leg_joint_positions(feet_pos, body_seg_pos, leg_length, neg):
+    # two bone ik for many legs at once
+    # feet_pos is (k, 3), body_seg_pos is (k, 4) [x, y, z, a], leg_length is
+    # a scalar or (k,) and neg picks which side the joint bends to
+    # returns the (k, 3) joint positions
+    feet_pos = np.asarray(feet_pos, dtype=np.float64).reshape(-1, 3)
+    body_seg_pos = np.asarray(body_seg_pos, dtype=np.float64).reshape(-1, 4)
+    neg = np.asarray(neg, dtype=np.float64)
+    # vector pointing from body to foot
+    body_to_foot_dir = feet_pos-body_seg_pos[:, :3]
+    # distance from foot to body segment
+    dist = np.sqrt(np.sum(body_to_foot_dir**2, axis=1))
+    # vector that the body is point in on the xy plane
+    facing_dir = np.zeros_like(body_to_foot_dir)
+    facing_dir[:, 0] = np.cos(body_seg_pos[:, 3])
+    facing_dir[:, 1] = np.sin(body_seg_pos[:, 3])
+    # take the cross product of these two vectors and normalize
+    # to find the direction that the joint should be perpendicular to the 
+    # body-foot disp and the facing direction
+    bend_vec = np.cross(body_to_foot_dir, facing_dir)
+    norm = np.sqrt(np.sum(bend_vec**2, axis=1))
+    bend_dir = bend_vec*np.where(norm!=0, neg/np.where(norm!=0, norm, 1), 1)[:, None]
+    # find the tail of the joint vector
+    bend_root = body_seg_pos[:, :3]+body_to_foot_dir/2
+    # each segment of the leg is half of the length of the entire leg
+    # use pythagorean to determine the magnitude of the joint vector
+    # absolute value to account for floating point arithmetic
+    joint_vec_size = np.sqrt(np.abs((np.asarray(leg_length)/2)**2-(dist/2)**2))
+    # now calculate the position of the joint
+    return bend_root+joint_vec_size[:, None]*bend_dir
@@ -0,0 +1,144 @@
+import numpy as np
+from math import pi
+from src.util.column_store import INITIAL_CAPACITY
+from src.util.settings import MAX_NUM_PARTS
+
+WIGGLE_MAG = 0.25
+
+def follow_the_leader(bones, heads, num_parts, sizes):
+    # bones is a padded (n, max_parts, 4) array of [x, y, z, a] segments,
+    # updated in place. every segment is pulled towards the one in front
+    # of it (the head for the first segment) until they are 2*size apart
+    num_parts = np.asarray(num_parts)
+    sizes = np.asarray(sizes, dtype=np.float64)
+    leader = np.asarray(heads, dtype=np.float64)[:, :3]
+    for i in range(bones.shape[1]):
+        active = i<num_parts
+        if not active.any():
+            break
+        segment = bones[:, i]
+        dx = leader[:, 0]-segment[:, 0]
+        dy = leader[:, 1]-segment[:, 1]
+        dz = leader[:, 2]-segment[:, 2]
+        dist = np.sqrt(dx**2+dy**2+dz**2)
+        angle = np.arctan2(dy, dx)
+        step = np.where(active, dist-2*sizes, 0)
+        segment[:, 0]+=step*np.cos(angle)
+        segment[:, 1]+=step*np.sin(angle)
+        segment[:, 3] = np.where(active, angle, segment[:, 3])
+        leader = segment[:, :3]
+
+def wiggle(bones, num_parts, torso_start, t):
+    # sideways sine wave along the torso, from the torso start to the tail
+    num_parts = np.asarray(num_parts)
+    torso_start = np.asarray(torso_start)
+    period = np.maximum(num_parts-torso_start, 1)
+    offset = WIGGLE_MAG*np.cos(t/100)
+    for i in range(bones.shape[1]):
+        active = (i>=torso_start) & (i<num_parts)
+        if not active.any():
+            continue
+        segment = bones[:, i]
+        perp_offset = np.where(active, offset*np.sin(pi/period*i), 0)
+        segment[:, 0]+=perp_offset*np.cos(segment[:, 3]+pi/2)
+        segment[:, 1]+=perp_offset*np.sin(segment[:, 3]+pi/2)
+
+class Skeletons:
+    # every creature's skeleton in one padded (n, max_parts, 4) array
+    # rows line up with entity slots, and each creature's skeleton is a
+    # view of its row so per-creature code keeps indexing it as before
+    def __init__(self, capacity=INITIAL_CAPACITY, max_parts=MAX_NUM_PARTS):
+        self.bones = np.zeros((capacity, max_parts, 4))
+        self.num_parts = np.zeros(capacity, dtype=np.int64)
+        self.size = np.zeros(capacity)
+        self.torso_start = np.zeros(capacity, dtype=np.int64)
+        self.creatures = []
+
+    def __len__(self):
+        return len(self.creatures)
+
+    def add(self, creature):
+        if len(self.creatures) == len(self.bones):
+            self.grow(2*len(self.bones), self.bones.shape[1])
+        creature.rig = self
+        creature.rig_slot = len(self.creatures)
+        self.creatures.append(creature)
+        self.attach(creature)
+
+    def attach(self, creature):
+        # copy the creature's skeleton and body data into its row
+        slot = creature.rig_slot
+        skeleton = creature.skeleton
+        num_parts = len(skeleton)
+        if num_parts > self.bones.shape[1]:
+            self.grow(len(self.bones), num_parts)
+        row = self.bones[slot]
+        if not np.shares_memory(skeleton, row):
+            row[:num_parts] = skeleton
+        creature.skeleton = row[:num_parts]
+        self.num_parts[slot] = num_parts
+        self.size[slot] = creature.size
+        # clamped so that creatures without a torso wiggle from the first segment
+        self.torso_start[slot] = max(creature.legs.get_torso_start(), 0)
+
+    def grow(self, capacity, max_parts):
+        bones = np.zeros((capacity, max_parts, 4))
+        count = len(self.creatures)
+        bones[:count, :self.bones.shape[1]] = self.bones[:count]
+        self.bones = bones
+        for name in ['num_parts', 'size', 'torso_start']:
+            column = getattr(self, name)
+            new_column = np.zeros(capacity, dtype=column.dtype)
+            new_column[:count] = column[:count]
+            setattr(self, name, new_column)
+        for creature in self.creatures:
+            creature.skeleton = self.bones[creature.rig_slot, :len(creature.skeleton)]
+
+    def swap_remove(self, slot):
+        # mirrors Entities.kill, the removed creature keeps a copy of its skeleton
+        removed = self.creatures[slot]
+        removed.skeleton = removed.skeleton.copy()
+        removed.rig = None
+        last = len(self.creatures)-1
+        if slot != last:
+            moved = self.creatures[last]
+            self.bones[slot] = self.bones[last]
+            self.num_parts[slot] = self.num_parts[last]
+            self.size[slot] = self.size[last]
+            self.torso_start[slot] = self.torso_start[last]
+            moved.rig_slot = slot
+            moved.skeleton = self.bones[slot, :len(moved.skeleton)]
+            self.creatures[slot] = moved
+        self.creatures.pop()
+
+    #############################
+    # batched movement          #
+    #############################
+    def follow(self, rows, heads):
+        # solves the chain constraint for the given rows in one sweep
+        if len(rows) == 0:
+            return
+        max_parts = self.num_parts[rows].max()
+        bones = self.bones[rows, :max_parts]
+        follow_the_leader(bones, heads, self.num_parts[rows], self.size[rows])
+        self.bones[rows, :max_parts] = bones
+
+    def wiggle(self, rows, t):
+        if len(rows) == 0:
+            return
+        max_parts = self.num_parts[rows].max()
+        bones = self.bones[rows, :max_parts]
+        wiggle(bones, self.num_parts[rows], self.torso_start[rows], t)
+        self.bones[rows, :max_parts] = bones
+
+    def hit_boxes(self, rows, heads):
+        # the head and segment spheres of each of rows as [x, y, z, r], one
+        # (len(rows), max_parts+1, 4) array padded with nan past the last
+        # segment of each creature
+        max_parts = self.num_parts[rows].max(initial=0)
+        boxes = np.full((len(rows), max_parts+1, 4), np.nan)
+        boxes[:, 0, :3] = heads[:, :3]
+        boxes[:, 1:, :3] = self.bones[rows, :max_parts, :3]
+        boxes[:, :, 3] = self.size[rows, None]
+        boxes[:, 1:][np.arange(max_parts) >= self.num_parts[rows, None]] = np.nan
+        return boxes
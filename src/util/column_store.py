@@ -0,0 +1,121 @@
+import numpy as np
+
+INITIAL_CAPACITY = 64
+
+class ColumnStore:
+    def __init__(self, layout, capacity=INITIAL_CAPACITY):
+        # layout maps a column name to the (row shape, dtype) of that column
+        # every column is preallocated to the same capacity and the first
+        # self.count rows are the live ones
+        self.layout = layout
+        self.count = 0
+        self.capacity = capacity
+        self.data = {}
+        for name, (shape, dtype) in layout.items():
+            self.data[name] = np.zeros((capacity,)+shape, dtype=dtype)
+
+    def __len__(self):
+        return self.count
+
+    def view(self, name):
+        return self.data[name][:self.count]
+
+    def append(self, row):
+        # returns the slot of the new row
+        if self.count == self.capacity:
+            self.grow()
+        slot = self.count
+        for name in self.data:
+            self.data[name][slot] = row.get(name, 0)
+        self.count+=1
+        return slot
+
+    def grow(self):
+        # doubling keeps appends amortized O(1)
+        self.capacity*=2
+        for name, column in self.data.items():
+            new_column = np.zeros((self.capacity,)+column.shape[1:], dtype=column.dtype)
+            new_column[:self.count] = column[:self.count]
+            self.data[name] = new_column
+
+    def swap_remove(self, slot):
+        # the last row is moved into the removed slot so removal is O(1)
+        # returns the slot that the moved row used to occupy
+        last = self.count-1
+        if slot != last:
+            for column in self.data.values():
+                column[slot] = column[last]
+        self.count-=1
+        return last
+
+HANDLE_INDEX_BITS = 32
+HANDLE_INDEX_MASK = (1 << HANDLE_INDEX_BITS)-1
+
+class Handles:
+    # generational handles that stay valid while rows are swap-removed
+    # the low bits of a handle pick an entry in the slot table and the high
+    # bits are the generation of that entry, which is bumped on release so
+    # stale handles to a reused entry no longer resolve
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        self.slots = np.full(capacity, -1, dtype=np.int64)
+        self.generations = np.zeros(capacity, dtype=np.int64)
+        self.free = []
+        self.used = 0
+
+    def new(self, slot):
+        if self.free:
+            entry = self.free.pop()
+        else:
+            if self.used == len(self.slots):
+                self.grow()
+            entry = self.used
+            self.used+=1
+        self.slots[entry] = slot
+        return int(self.generations[entry]) << HANDLE_INDEX_BITS | entry
+
+    def grow(self):
+        capacity = 2*len(self.slots)
+        slots = np.full(capacity, -1, dtype=np.int64)
+        slots[:self.used] = self.slots[:self.used]
+        generations = np.zeros(capacity, dtype=np.int64)
+        generations[:self.used] = self.generations[:self.used]
+        self.slots = slots
+        self.generations = generations
+
+    def slot(self, handle):
+        # returns None if the handle is stale
+        entry = handle & HANDLE_INDEX_MASK
+        if entry >= self.used or self.generations[entry] != handle >> HANDLE_INDEX_BITS:
+            return None
+        slot = self.slots[entry]
+        if slot == -1:
+            return None
+        return int(slot)
+
+    def move(self, handle, slot):
+        self.slots[handle & HANDLE_INDEX_MASK] = slot
+
+    def release(self, handle):
+        entry = handle & HANDLE_INDEX_MASK
+        self.slots[entry] = -1
+        self.generations[entry]+=1
+        self.free.append(entry)
+
+def swap_pop(items, index):
+    # list counterpart of ColumnStore.swap_remove
+    items[index] = items[-1]
+    items.pop()
+
+class Column:
+    # exposes one column of the owner's store as a plain attribute
+    # so that existing code can keep indexing entities.pos[i][0] etc
+    def __set_name__(self, owner_type, name):
+        self.name = name
+
+    def __get__(self, owner, owner_type=None):
+        if owner is None:
+            return self
+        return owner.columns.view(self.name)
+
+    def __set__(self, owner, value):
+        owner.columns.view(self.name)[:] = value
@@ -1,5 +1,9 @@
 import pygame as pg
 from math import ceil
+from src.util.lru_cache import LRUCache
+from src.util.settings import GLYPH_CACHE_SIZE, TEXT_CACHE_SIZE
+
+WHITE = (255, 255, 255, 255)
 
 class Font:
     def __init__(self, image, padding=1):
@@ -11,6 +15,13 @@ class Font:
         self.font_height = self.image.get_height()
         self.padding = padding
         self.load_font()
+
+        # rendering the same text again costs a single blit
+        self.glyphs = LRUCache(GLYPH_CACHE_SIZE)
+        self.texts = LRUCache(TEXT_CACHE_SIZE)
+        self.layouts = LRUCache(TEXT_CACHE_SIZE)
+        self.paragraphs = LRUCache(TEXT_CACHE_SIZE)
+        self.heights = LRUCache(TEXT_CACHE_SIZE)
     
     def load_font_key(self, chars):
         for char in chars:
@@ -31,6 +42,11 @@ class Font:
             self.char_dict[self.char_key[i]] = white
 
     def get_paragraph(self, text_list, max_char_per_line):
+        key = (tuple(text_list), max_char_per_line)
+        lines = self.paragraphs.get(key)
+        if lines is not None:
+            return lines
+
         char_count = 0
         lines = []
         line = []
@@ -52,12 +68,35 @@ class Font:
 
         if line:
             lines.append(line)
+        self.paragraphs.put(key, lines)
         return lines
 
-    def render(self, screen, text, x, y, colour, size=0, style='left', alpha = 255, box_width=0):
-        if size==0:
-            size = self.font_width
-        
+    ############################# 
+    # caches                    #
+    ############################# 
+    def glyph(self, char, size, scaled_height, colour, alpha=255):
+        # a char scaled and coloured, colour is an (r, g, b, a) tuple
+        key = (char, size, colour, alpha)
+        letter = self.glyphs.get(key)
+        if letter is None:
+            letter = self.char_dict[char]
+            letter.set_colorkey((255, 255, 255))
+            coloured_letter = pg.Surface((self.font_width, self.font_height))
+            coloured_letter.fill(colour)
+            coloured_letter.blit(letter, (0, 0))
+            letter = pg.transform.scale(coloured_letter, (size, scaled_height))
+            letter.set_colorkey((0, 0, 0))
+            letter.set_alpha(alpha)
+            self.glyphs.put(key, letter)
+        return letter
+
+    def layout(self, text, size, style, box_width):
+        # top left corner of every char relative to the (x, y) passed to render
+        key = (text, size, style, box_width)
+        layout = self.layouts.get(key)
+        if layout is not None:
+            return layout
+
         ratio = size/self.font_width
         scaled_height = ceil(ratio*self.font_height)
         scaled_padding = ceil(ratio*self.padding)
@@ -69,31 +108,83 @@ class Font:
             max_char_per_line = box_width//(size+scaled_padding)
 
         paragraph = self.get_paragraph(text_list, max_char_per_line)
-        start_x, start_y = x, y
+        start_x, start_y = 0, 0
 
         if style=='center':
-            start_y = y-(scaled_height+scaled_padding)*(len(paragraph)-1)/2
+            start_y = -(scaled_height+scaled_padding)*(len(paragraph)-1)/2
         
+        chars = []
         for line_num, line in enumerate(paragraph):
             char_count = 0
             if style=='center':
-                start_x = x-(size+scaled_padding)*(len(' '.join(line))-1)/2
+                start_x = -(size+scaled_padding)*(len(' '.join(line))-1)/2
             for word in line:
                 for char in word:
-                    char = char.lower()
-                    letter = self.char_dict[char]
-                    letter.set_colorkey((255, 255, 255))
-                    coloured_letter = pg.Surface((self.font_width, self.font_height))
-                    coloured_letter.fill(colour)
-                    coloured_letter.blit(letter, (0, 0))
-                    letter = pg.transform.scale(coloured_letter, (size, scaled_height))
-                    letter.set_colorkey((0, 0, 0))
-                    letter.set_alpha(alpha)
-                    screen.blit(letter, 
-                                (start_x+(size+scaled_padding)*char_count-size//2, 
-                                 start_y+(scaled_height+scaled_padding)*line_num-scaled_height//2))
+                    chars.append((char.lower(),
+                                  start_x+(size+scaled_padding)*char_count-size//2,
+                                  start_y+(scaled_height+scaled_padding)*line_num-scaled_height//2))
                     char_count+=1
                 char_count+=1
+
+        layout = (scaled_height, chars)
+        self.layouts.put(key, layout)
+        return layout
+
+    def text_surface(self, text, size, colour, style, box_width):
+        # the whole string on one colorkeyed surface and its offset from (x, y)
+        # alpha is set when blitting, so a fade reuses the same surface
+        key = (text, size, colour, style, box_width)
+        cached = self.texts.get(key)
+        if cached is not None:
+            return cached
+
+        scaled_height, chars = self.layout(text, size, style, box_width)
+        if not chars:
+            return None
+        left = min(char[1] for char in chars)
+        top = min(char[2] for char in chars)
+        width = int(max(char[1] for char in chars)-left)+size+1
+        height = int(max(char[2] for char in chars)-top)+scaled_height+1
+        surface = pg.Surface((width, height))
+        surface.set_colorkey((0, 0, 0))
+        for char, char_x, char_y in chars:
+            surface.blit(self.glyph(char, size, scaled_height, colour), (char_x-left, char_y-top))
+
+        cached = (surface, left, top)
+        self.texts.put(key, cached)
+        return cached
+
+    def render(self, screen, text, x, y, colour, size=0, style='left', alpha = 255, box_width=0, tint=False):
+        # tint is for a colour that changes every frame, the string is kept
+        # white and coloured on a copy when blitting instead of cached per colour
+        if size==0:
+            size = self.font_width
+        
+        colour = tuple(pg.Color(colour))
+        cached = self.text_surface(text, size, WHITE if tint else colour, style, box_width)
+        if cached is None:
+            return
+        surface, left, top = cached
+        if tint:
+            surface = surface.copy()
+            surface.fill(colour, special_flags=pg.BLEND_RGB_MULT)
+        surface.set_alpha(alpha)
+        screen.blit(surface, (x+left, y+top))
+
+    def render_glyphs(self, screen, text, x, y, colour, size=0):
+        # a left aligned line drawn char by char from the glyph cache, for
+        # text that changes every frame and would only churn the string caches
+        if size==0:
+            size = self.font_width
+
+        ratio = size/self.font_width
+        scaled_height = ceil(ratio*self.font_height)
+        step = size+ceil(ratio*self.padding)
+        colour = tuple(pg.Color(colour))
+        for i, char in enumerate(text.lower()):
+            if char in self.char_dict:
+                screen.blit(self.glyph(char, size, scaled_height, colour),
+                            (x+step*i-size//2, y-scaled_height//2))
         
     def text_width(self, text, size):
         if size==0:
@@ -105,6 +196,15 @@ class Font:
         return len(text)*(size+scaled_padding)
 
     def text_height(self, text, size=0, width=0):
+        key = (text, size, width)
+        height = self.heights.get(key)
+        if height is not None:
+            return height
+        height = self.calculate_text_height(text, size, width)
+        self.heights.put(key, height)
+        return height
+
+    def calculate_text_height(self, text, size, width):
         if size==0:
             size = self.font_width
             
@@ -0,0 +1,30 @@
+from collections import OrderedDict
+
+class LRUCache:
+    # dict with a bounded size, the least recently used entry is evicted first
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        # returns None on a miss
+        if key not in self.entries:
+            self.misses+=1
+            return None
+        self.hits+=1
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
@@ -1,3 +1,4 @@
+import numpy as np
 from math import atan2, sqrt
 
 def new_vel(a, v, dir, dt):
@@ -12,12 +13,10 @@ def new_vel(a, v, dir, dt):
     else:
         return 0
 
-def collide(p1, p2):
-    sq_dist = (p1[0]-p2[0])**2
-    sq_dist+=(p1[1]-p2[1])**2
-    sq_dist+=(p1[2]-p2[2])**2
-    
-    return sq_dist<=(p1[3]+p2[3])**2
+def new_vels(a, v, dir, dt):
+    # new_vel over arrays of accelerations, velocities and directions
+    step = a*dt
+    return np.select([dir>0, dir<0, v>step, v<-step], [v+step, v-step, v-step, v+step], 0.0)
 
 def dist_between(pos1, pos2):
         return sqrt((pos1[0]-pos2[0])**2+
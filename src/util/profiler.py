@@ -0,0 +1,115 @@
+import json
+import pygame as pg
+from collections import deque
+from contextlib import contextmanager
+from time import perf_counter
+from src.util.settings import FPS, PROFILER_FRAMES, PROFILER_UI
+
+class Profiler:
+    # named timing spans, grouped into frames and kept for the last
+    # num_frames frames. spans nest, each keeps its depth
+    def __init__(self, num_frames=PROFILER_FRAMES):
+        self.frames = deque(maxlen=num_frames)  # (start, end, spans) of each frame
+        self.spans = []                         # (name, start, end, depth) of the current frame
+        self.depth = 0
+        self.origin = perf_counter()
+        self.frame_start = self.origin
+        self.show_overlay = False
+
+    #############################
+    # recording                 #
+    #############################
+    def begin_frame(self):
+        self.frame_start = perf_counter()
+        self.spans = []
+        self.depth = 0
+
+    def end_frame(self):
+        self.frames.append((self.frame_start, perf_counter(), self.spans))
+
+    @contextmanager
+    def span(self, name):
+        start = perf_counter()
+        self.depth+=1
+        try:
+            yield
+        finally:
+            self.depth-=1
+            self.spans.append((name, start, perf_counter(), self.depth))
+
+    #############################
+    # reporting                 #
+    #############################
+    def worst_frame(self):
+        # the slowest frame in the buffer and its slowest top level span
+        if not self.frames:
+            return 0, ''
+        start, end, spans = max(self.frames, key=lambda frame: frame[1]-frame[0])
+        top_level = [span for span in spans if span[3] == 0]
+        slowest = max(top_level, key=lambda span: span[2]-span[1])[0] if top_level else ''
+        return (end-start)*1000, slowest
+
+    def chrome_trace(self):
+        # complete events in microseconds, loadable in chrome://tracing or perfetto
+        events = []
+        for i, (start, end, spans) in enumerate(self.frames):
+            events.append({
+                'name': 'frame',
+                'ph': 'X',
+                'ts': (start-self.origin)*1e6,
+                'dur': (end-start)*1e6,
+                'pid': 0,
+                'tid': 0,
+                'args': {'frame': i},
+            })
+            for name, span_start, span_end, depth in spans:
+                events.append({
+                    'name': name,
+                    'ph': 'X',
+                    'ts': (span_start-self.origin)*1e6,
+                    'dur': (span_end-span_start)*1e6,
+                    'pid': 0,
+                    'tid': 0,
+                })
+        return {
+            'traceEvents': events,
+            'displayTimeUnit': 'ms',
+        }
+
+    def export_chrome_trace(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.chrome_trace(), f)
+
+    #############################
+    # overlay                   #
+    #############################
+    def toggle_overlay(self):
+        self.show_overlay = not self.show_overlay
+
+    def render(self, screen, font):
+        # times of the last frame's spans, drawn as bars against the frame budget
+        if not self.show_overlay or not self.frames:
+            return
+        x, y = PROFILER_UI['x'], PROFILER_UI['y']
+        size = PROFILER_UI['f']
+        line_height = PROFILER_UI['h']
+        bar_width = PROFILER_UI['w']
+        budget = 1000/FPS
+
+        start, end, spans = self.frames[-1]
+        worst_ms, worst_span = self.worst_frame()
+        lines = [(f'frame {(end-start)*1000:.1f}ms', 0, (end-start)*1000)]
+        for name, span_start, span_end, depth in sorted(spans, key=lambda span: span[1]):
+            lines.append((f'{name} {(span_end-span_start)*1000:.2f}', depth, (span_end-span_start)*1000))
+        lines.append((f'worst {worst_ms:.1f}ms {worst_span}', 0, worst_ms))
+
+        background = pg.Surface((bar_width+PROFILER_UI['text_w'], line_height*len(lines)+line_height))
+        background.set_alpha(150)
+        screen.blit(background, (x-size, y-line_height))
+        for i, (text, depth, ms) in enumerate(lines):
+            line_y = y+i*line_height
+            colour = PROFILER_UI['colours'][0] if ms <= budget else PROFILER_UI['colours'][1]
+            pg.draw.rect(screen, colour, (x+PROFILER_UI['text_w'], line_y-size//2,
+                                          min(ms/budget, 1)*bar_width, size))
+            font.render_glyphs(screen=screen, text=text, x=x+depth*2*size, y=line_y,
+                               colour=(255, 255, 255), size=size)
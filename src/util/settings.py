@@ -10,6 +10,50 @@ MAX_NUM_PARTS = 10
 
 NEW_GEN_TIME = 10000
 
+# the simulation runs in fixed steps of SIM_STEP_MS, movement is scaled
+# by dt = ms/15 so a 15ms step is a dt of 1
+SIM_STEP_MS = 15
+# most steps run in one frame before the backlog is dropped
+MAX_CATCH_UP_STEPS = 5
+# slots of the timing wheel that fires status and cooldown expiries,
+# one slot per step, events further out wait for the wheel to come round
+TIMING_WHEEL_SLOTS = 256
+
+# half the side of the square that extra creatures are spawned in
+SPAWN_RADIUS = 300
+# worlds built with at least this many creatures keep their behaviour
+# scores sparse instead of in N x N matrices, and worlds that grow past it
+# move their scores over
+SPARSE_BEHAVIOUR_CREATURES = 2000
+# targets kept in each entity's threat list
+THREAT_LIST_SIZE = 8
+# simulation level of detail by distance from the camera. near entities
+# get their skeleton, legs, ai and combat every step, mid range entities
+# run their ai every few steps and keep no skeleton, far entities only get
+# a coarse ai, position and energy step now and then
+LOD_NEAR, LOD_MID, LOD_FAR = 0, 1, 2
+LOD_NEAR_RADIUS = WIDTH/2
+LOD_MID_RADIUS = 2*WIDTH
+# steps between ai updates of near, mid and far entities
+LOD_AI_INTERVALS = [1, 4, 16]
+# steps between the position and energy updates of near, mid and far
+# entities, each update covers the dt built up since the last
+LOD_STEP_INTERVALS = [1, 1, 16]
+# ms per step the ai may spend making decisions, the entities left over
+# keep steering the way they last decided
+AI_BUDGET_MS = 5
+# entities decided between checks of the ai budget
+AI_BATCH_SIZE = 128
+# entities in a fight are due this many times as often
+AI_COMBAT_PRIORITY = 2
+# worker processes that plan ai batches from shared memory, 0 plans in
+# the main process. batches are larger with workers to pay for the round trip
+AI_WORKERS = 0
+AI_WORKER_BATCH_SIZE = 2048
+
+# side length of the cells of the spatial hash used for neighbour queries
+GRID_CELL_SIZE = 128
+
 BASE_MIN_STATS = {
     'itl': 0,
     'pwr': 0,
@@ -197,6 +241,9 @@ HUD_BOTTOM = HEIGHT-16
 
 HEADER = 75
 TITLE_FONT_SIZE = 24
+# most glyphs and rendered strings kept by each Font
+GLYPH_CACHE_SIZE = 1024
+TEXT_CACHE_SIZE = 256
 
 # quests
 QUEST_CARD_UI = {
@@ -223,3 +270,16 @@ INTERACTION_WHEEL_UI = {
     'c': (255, 255, 255), 
     'a': 50
 }
+
+# profiler
+PROFILER_FRAMES = 300
+PROFILER_TRACE_PATH = 'profile_trace.json'
+PROFILER_UI = {
+    'x': 20,
+    'y': 20,
+    'f': 8,
+    'h': 14,
+    'w': 100,
+    'text_w': 220,
+    'colours': [(0, 255, 0), (255, 0, 0)],
+}
@@ -0,0 +1,32 @@
+from src.util.settings import SIM_STEP_MS, MAX_CATCH_UP_STEPS
+
+class SimClock:
+    # simulation time in ms, advanced in fixed steps so that the simulation
+    # runs the same regardless of the frame rate
+    def __init__(self, step_ms=SIM_STEP_MS, max_steps=MAX_CATCH_UP_STEPS):
+        self.step_ms = step_ms
+        self.dt = step_ms/15
+        self.max_steps = max_steps
+        self.time = 0
+        self.steps = 0
+        # real time not yet simulated
+        self.accumulator = 0
+        # how far the frame is between the last two steps, for interpolation
+        self.alpha = 1
+
+    def accumulate(self, frame_ms):
+        # returns the number of steps to run for a frame that took frame_ms
+        self.accumulator+=frame_ms
+        num_steps = int(self.accumulator//self.step_ms)
+        if num_steps > self.max_steps:
+            # under load, drop the backlog instead of falling further behind
+            num_steps = self.max_steps
+            self.accumulator = self.accumulator%self.step_ms
+        else:
+            self.accumulator-=num_steps*self.step_ms
+        self.alpha = self.accumulator/self.step_ms
+        return num_steps
+
+    def step(self):
+        self.time+=self.step_ms
+        self.steps+=1
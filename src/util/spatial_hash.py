@@ -0,0 +1,149 @@
+import numpy as np
+
+# cell coordinates are offset and packed into one integer key so that
+# the cells of one grid column form a contiguous range of keys
+CELL_OFFSET = 1 << 20
+CELL_STRIDE = 1 << 21
+
+def ranks(counts):
+    # 0..count-1 for each of counts, concatenated
+    return np.arange(counts.sum())-np.repeat(np.cumsum(counts)-counts, counts)
+
+class SpatialHash:
+    # uniform grid over the xy plane, stored as a list of item indices
+    # sorted by cell key so that a block of cells is found with searchsorted
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.pos = np.zeros((0, 2))
+        self.cells = np.zeros(0, dtype=np.int64)    # cell key of each item
+        self.keys = np.zeros(0, dtype=np.int64)     # sorted cell keys
+        self.order = np.zeros(0, dtype=np.int64)    # item index of each sorted key
+        self.columns = (0, -1)                      # occupied range of cell columns
+        self.stale = True
+
+    #############################
+    # building                  #
+    #############################
+    def cell_coords(self, xy):
+        return np.floor(np.asarray(xy, dtype=np.float64)/self.cell_size).astype(np.int64)
+
+    def cell_keys(self, cx, cy):
+        return (cx+CELL_OFFSET)*CELL_STRIDE+(cy+CELL_OFFSET)
+
+    def xy(self, pos):
+        if len(pos) == 0:
+            return np.zeros((0, 2))
+        return np.array(pos, dtype=np.float64)[:, :2]
+
+    def rebuild(self, pos):
+        self.pos = self.xy(pos)
+        coords = self.cell_coords(self.pos)
+        self.sort(self.cell_keys(coords[:, 0], coords[:, 1]), coords[:, 0])
+        self.stale = False
+
+    def arrays(self):
+        # the built grid as arrays, for handing to another process, see load
+        return {'pos': self.pos, 'cells': self.cells, 'keys': self.keys, 'order': self.order,
+                'columns': np.array(self.columns, dtype=np.int64)}
+
+    def load(self, pos, cells, keys, order, columns):
+        # takes over a grid built elsewhere from its arrays()
+        self.pos = pos
+        self.cells = cells
+        self.keys = keys
+        self.order = order
+        self.columns = tuple(columns.tolist())
+        self.stale = False
+
+    def sort(self, cells, columns):
+        self.cells = cells
+        self.order = np.argsort(self.cells, kind='stable')
+        self.keys = self.cells[self.order]
+        if len(columns):
+            self.columns = (columns.min(), columns.max())
+        else:
+            self.columns = (0, -1)
+
+    def update(self, pos):
+        # incremental update, the sort is only redone if an item changed cell
+        # returns the indices of the items that changed cell
+        if self.stale or len(pos) != len(self.cells):
+            self.rebuild(pos)
+            return np.arange(len(self.cells))
+        self.pos = self.xy(pos)
+        coords = self.cell_coords(self.pos)
+        cells = self.cell_keys(coords[:, 0], coords[:, 1])
+        moved = np.flatnonzero(cells != self.cells)
+        if len(moved):
+            self.sort(cells, coords[:, 0])
+        return moved
+
+    def invalidate(self):
+        # call when items are added or removed, the next update rebuilds
+        self.stale = True
+
+    #############################
+    # queries                   #
+    #############################
+    def candidates(self, x, y, radius):
+        # every item in the cells overlapping the square around (x, y)
+        (cx0, cy0), (cx1, cy1) = self.cell_coords([[x-radius, y-radius], [x+radius, y+radius]])
+        columns = np.arange(max(cx0, self.columns[0]), min(cx1, self.columns[1])+1)
+        starts = np.searchsorted(self.keys, self.cell_keys(columns, cy0), side='left')
+        ends = np.searchsorted(self.keys, self.cell_keys(columns, cy1), side='right')
+        ranges = [self.order[start:end] for start, end in zip(starts, ends) if end>start]
+        if not ranges:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate(ranges)
+
+    def query_radius(self, x, y, radius):
+        # indices of the items within radius of (x, y) in the xy plane
+        candidates = self.candidates(x, y, radius)
+        dx = self.pos[candidates, 0]-x
+        dy = self.pos[candidates, 1]-y
+        return candidates[dx**2+dy**2<=radius**2]
+
+    def query_radius_batch(self, xy, radius):
+        # every (query, item) pair with the item within radius of the query
+        # point xy[query], and their squared distance. radius is one for all
+        # queries or one per query. the cell ranges of all queries are
+        # looked up together, one entry per query and overlapped grid
+        # column, and then expanded into candidate pairs
+        xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+        if len(self.cells) == 0 or len(xy) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0)
+        radius = np.broadcast_to(np.asarray(radius, dtype=np.float64), (len(xy),))
+        low = self.cell_coords(xy-radius[:, None])
+        high = self.cell_coords(xy+radius[:, None])
+        first = np.maximum(low[:, 0], self.columns[0])
+        spans = np.maximum(np.minimum(high[:, 0], self.columns[1])-first+1, 0)
+        queries = np.repeat(np.arange(len(xy)), spans)
+        columns = np.repeat(first, spans)+ranks(spans)
+        starts = np.searchsorted(self.keys, self.cell_keys(columns, low[queries, 1]), side='left')
+        ends = np.searchsorted(self.keys, self.cell_keys(columns, high[queries, 1]), side='right')
+        counts = ends-starts
+        queries = np.repeat(queries, counts)
+        items = self.order[np.repeat(starts, counts)+ranks(counts)]
+        dist_sq = (self.pos[items, 0]-xy[queries, 0])**2+(self.pos[items, 1]-xy[queries, 1])**2
+        within = dist_sq<=radius[queries]**2
+        return queries[within], items[within], dist_sq[within]
+
+    def k_nearest(self, x, y, k, max_radius=np.inf):
+        # indices of up to k items closest to (x, y), nearest first
+        if len(self.cells) == 0 or k <= 0:
+            return np.zeros(0, dtype=np.int64)
+        # the query square never has to grow past the extent of the items
+        extent = np.max(np.abs(self.pos-[x, y]))*1.5+self.cell_size
+        radius = min(self.cell_size, max_radius)
+        while True:
+            candidates = self.candidates(x, y, radius)
+            dist_sq = (self.pos[candidates, 0]-x)**2+(self.pos[candidates, 1]-y)**2
+            within = dist_sq<=radius**2
+            # everything within the radius has been found, so once k of
+            # them are inside it no item outside can be closer
+            if np.count_nonzero(within)>=k or radius>=max_radius or radius>=extent:
+                candidates = candidates[within]
+                dist_sq = dist_sq[within]
+                nearest = np.argsort(dist_sq, kind='stable')[:k]
+                return candidates[nearest]
+            radius = min(2*radius, max_radius)
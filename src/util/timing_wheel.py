@@ -0,0 +1,42 @@
+from math import ceil
+from src.util.settings import SIM_STEP_MS, TIMING_WHEEL_SLOTS
+
+class TimingWheel:
+    # hashed timing wheel of events keyed by simulation time in ms
+    # an event is kept in the slot of the tick it is due on, so advancing
+    # only looks at the slots of the ticks that passed. events more than one
+    # turn of the wheel away wait in their slot until their turn comes round
+    def __init__(self, tick_ms=SIM_STEP_MS, num_slots=TIMING_WHEEL_SLOTS, now=0):
+        self.tick_ms = tick_ms
+        self.slots = [[] for i in range(num_slots)]
+        self.tick = int(now//tick_ms)   # next tick to be processed
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def schedule(self, time, event):
+        # events fire on the first tick at or after time
+        tick = max(ceil(time/self.tick_ms), self.tick)
+        self.slots[tick%len(self.slots)].append((time, tick, event))
+        self.count+=1
+
+    def advance(self, now):
+        # returns the events due by now, in the order they are due
+        last = int(now//self.tick_ms)
+        if last < self.tick:
+            return []
+        # past one turn every slot has been visited
+        num_ticks = min(last-self.tick+1, len(self.slots))
+        due = []
+        for tick in range(self.tick, self.tick+num_ticks):
+            index = tick%len(self.slots)
+            slot = self.slots[index]
+            if not slot:
+                continue
+            due.extend(entry for entry in slot if entry[1] <= last)
+            self.slots[index] = [entry for entry in slot if entry[1] > last]
+        self.tick = last+1
+        self.count-=len(due)
+        due.sort(key=lambda entry: entry[0])
+        return [event for time, tick, event in due]